@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
-from .models import Department, Job, HiredEmployee, CustomUser
+from .models import Department, Job, HiredEmployee, CustomUser, RejectedRecord
+from .cache import bump_table_versions, stamp_row_versions
+from .partitions import ensure_employee_partitions
+from .rollups import existing_hires, hires_of, remove_from_hiring_summary, update_hiring_summary
 
 # Register your models here.
 
@@ -10,8 +13,29 @@ class UserAdmin(DefaultUserAdmin):
     pass
 
 
+class VersionedModelAdmin(admin.ModelAdmin):
+    """Bumps the data version of the table on every change, so cached reports are refreshed"""
+
+    def bump_versions(self):
+        # Departments and jobs cascade their deletes to the employees
+        bump_table_versions(self.model, HiredEmployee)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Stamped with the new data version of the table once it is written
+        obj.row_version = stamp_row_versions(self.model, [obj.pk])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.bump_versions()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self.bump_versions()
+
+
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(VersionedModelAdmin):
     fields = (
         "id", "department",
     )
@@ -22,7 +46,7 @@ class DepartmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
+class JobAdmin(VersionedModelAdmin):
     fields = (
         "id", "job",
     )
@@ -33,7 +57,7 @@ class JobAdmin(admin.ModelAdmin):
 
 
 @admin.register(HiredEmployee)
-class HiredEmployeeAdmin(admin.ModelAdmin):
+class HiredEmployeeAdmin(VersionedModelAdmin):
     fields = (
         "id", "name", "datetime", "department_id", "job_id",
     )
@@ -42,4 +66,33 @@ class HiredEmployeeAdmin(admin.ModelAdmin):
     )
     readonly_fields = (
         "datetime",
-    )
\ No newline at end of file
+    )
+
+    # Keep the HiringSummary rollup in step with the changes made here
+
+    def save_model(self, request, obj, form, change):
+        previous = existing_hires([obj.pk])
+        ensure_employee_partitions([obj])
+        super().save_model(request, obj, form, change)
+        update_hiring_summary(hires_of([obj]), previous.values())
+
+    def delete_model(self, request, obj):
+        remove_from_hiring_summary(HiredEmployee.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        remove_from_hiring_summary(queryset)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(RejectedRecord)
+class RejectedRecordAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "table", "source", "reason", "attempts", "created_at",
+    )
+    list_filter = (
+        "table", "source",
+    )
+    readonly_fields = (
+        "created_at", "last_replayed_at",
+    )
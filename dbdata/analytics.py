@@ -0,0 +1,195 @@
+# dbchallenge/dbdata/analytics.py
+
+import logging
+import threading
+import time
+from collections import Counter
+import numpy as np
+from django.db.models import Value
+from django.db.models.functions import Coalesce, ExtractQuarter, ExtractYear
+from .cache import get_table_versions
+from .formats import iter_chunks
+from .models import Department, Job, HiredEmployee, HiringSummary
+from .reports import QUARTERS
+from .rollups import UNKNOWN_PERIOD, years_of
+
+logger = logging.getLogger(__name__)
+
+# Tables read by the snapshot
+SNAPSHOT_MODELS = (Department, Job, HiredEmployee)
+
+# Employees read from the database per round trip while loading
+SNAPSHOT_FETCH_SIZE = 20000
+
+# Engines of the reports: SQL over the rollup, or the in-process snapshot
+ENGINE_SQL = "sql"
+ENGINE_SNAPSHOT = "snapshot"
+ENGINES = (ENGINE_SQL, ENGINE_SNAPSHOT)
+
+
+class HiringSnapshot:
+    """
+    Columnar copy of the employee table held by the worker process: one NumPy
+    array per column of (department id, job id, hiring year, hiring quarter),
+    the year and quarter extracted by the database like the rollup. The
+    reports are computed with bincount group-bys over dense department and
+    job codes, without querying the employee table.
+
+    refresh() reads the data versions of the tables and does nothing while
+    they are unchanged. Otherwise it appends the employees above the highest
+    id loaded so far and compares its counts with the HiringSummary rollup,
+    which every write keeps exact: a mismatch means that rows were updated,
+    deleted or inserted below that id, and the snapshot is loaded again.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.versions = None
+        self.max_id = None
+        self.department_ids = np.empty(0, dtype=np.int32)
+        self.job_ids = np.empty(0, dtype=np.int32)
+        self.years = np.empty(0, dtype=np.int16)
+        self.quarters = np.empty(0, dtype=np.int8)
+        # Hires by (department id, job id, year, quarter), the same keys as the rollup
+        self.counts = Counter()
+        self.departments = {}
+        self.jobs = {}
+
+    def clear(self):
+        with self.lock:
+            self.reset()
+
+    def refresh(self):
+        """Bring the snapshot up to date with the tables. Called with the lock held."""
+        versions = get_table_versions(SNAPSHOT_MODELS)
+        if versions == self.versions:
+            return
+
+        start = time.time()
+        loaded = self.load(self.max_id)
+        if self.counts != rollup_counts():
+            self.reset()
+            loaded = self.load(None)
+
+        self.departments = dict(Department.objects.values_list("id", "department"))
+        self.jobs = dict(Job.objects.values_list("id", "job"))
+        self.encode()
+        self.versions = versions
+        logger.debug("Analytics snapshot: %d employees loaded, %d in total, refreshed in %.3fs",
+                     loaded, len(self.years), time.time() - start)
+
+    def load(self, above_id):
+        """Append the employees whose id is above above_id, or all of them when it is None"""
+        queryset = HiredEmployee.objects.all()
+        if above_id is not None:
+            queryset = queryset.filter(id__gt=above_id)
+        queryset = (
+            queryset.order_by("id")
+            .annotate(
+                year=Coalesce(ExtractYear("datetime"), Value(UNKNOWN_PERIOD)),
+                quarter=Coalesce(ExtractQuarter("datetime"), Value(UNKNOWN_PERIOD)),
+            )
+            .values_list("id", "department_id", "job_id", "year", "quarter")
+        )
+
+        chunks = [
+            np.array(chunk, dtype=np.int64)
+            for chunk in iter_chunks(queryset.iterator(chunk_size=SNAPSHOT_FETCH_SIZE), SNAPSHOT_FETCH_SIZE)
+        ]
+        if not chunks:
+            return 0
+
+        rows = np.concatenate(chunks)
+        self.max_id = int(rows[-1, 0]) if self.max_id is None else max(self.max_id, int(rows[-1, 0]))
+        self.department_ids = np.concatenate([self.department_ids, rows[:, 1].astype(np.int32)])
+        self.job_ids = np.concatenate([self.job_ids, rows[:, 2].astype(np.int32)])
+        self.years = np.concatenate([self.years, rows[:, 3].astype(np.int16)])
+        self.quarters = np.concatenate([self.quarters, rows[:, 4].astype(np.int8)])
+
+        keys, totals = np.unique(rows[:, 1:], axis=0, return_counts=True)
+        for key, total in zip(keys.tolist(), totals.tolist()):
+            self.counts[tuple(key)] += total
+        return len(rows)
+
+    def encode(self):
+        """Dense codes of the departments and jobs, their positions in the sorted ids of the tables"""
+        self.department_index = np.array(sorted(self.departments), dtype=np.int64)
+        self.job_index = np.array(sorted(self.jobs), dtype=np.int64)
+        self.department_codes = np.searchsorted(self.department_index, self.department_ids)
+        self.job_codes = np.searchsorted(self.job_index, self.job_ids)
+
+    def in_years(self, year_ranges):
+        """Mask of the employees hired in the (first, last) year ranges"""
+        return np.isin(self.years, np.array(sorted(years_of(year_ranges)), dtype=np.int16))
+
+    def hired_by_quarter(self, year_ranges):
+        """Rows of the quarter report: department, job and the hires of each quarter"""
+        with self.lock:
+            self.refresh()
+            mask = self.in_years(year_ranges)
+            jobs = len(self.job_index)
+            groups = self.department_codes[mask] * jobs + self.job_codes[mask]
+            quarters = len(QUARTERS) + 1
+            counts = np.bincount(
+                groups * quarters + self.quarters[mask],
+                minlength=len(self.department_index) * jobs * quarters,
+            ).reshape(-1, quarters)
+
+            # Grouped by names like the SQL report
+            rows = {}
+            for group in np.flatnonzero(counts.sum(axis=1)).tolist():
+                department_code, job_code = divmod(group, jobs)
+                key = (
+                    self.departments[int(self.department_index[department_code])],
+                    self.jobs[int(self.job_index[job_code])],
+                )
+                totals = rows.setdefault(key, [0] * len(QUARTERS))
+                for position, quarter in enumerate(QUARTERS):
+                    totals[position] += int(counts[group, quarter])
+
+        return [key + tuple(totals) for key, totals in sorted(rows.items())]
+
+    def hired_by_department(self, year_ranges):
+        """
+        Rows of the department report: departments whose all-time hires are
+        above the mean hires of a department per year in the year ranges
+        """
+        with self.lock:
+            self.refresh()
+            departments = len(self.department_index)
+            totals = np.bincount(self.department_codes, minlength=departments)
+
+            mask = self.in_years(year_ranges)
+            years, year_codes = np.unique(self.years[mask], return_inverse=True)
+            per_year = np.bincount(
+                year_codes.ravel() * departments + self.department_codes[mask],
+                minlength=len(years) * departments,
+            )
+            per_year = per_year[per_year > 0]
+            if not len(per_year):
+                return []
+
+            above = np.flatnonzero(totals > per_year.mean())
+            rows = [
+                (int(self.department_index[code]), self.departments[int(self.department_index[code])], int(totals[code]))
+                for code in above.tolist()
+            ]
+
+        return sorted(rows, key=lambda row: (-row[2], row[0]))
+
+
+def rollup_counts():
+    """Hires by (department id, job id, year, quarter) of the HiringSummary rollup"""
+    return Counter({
+        (department_id, job_id, year, quarter): total
+        for department_id, job_id, year, quarter, total in HiringSummary.objects.values_list(
+            "department_id", "job_id", "year", "quarter", "total"
+        )
+    })
+
+
+# One snapshot per worker process
+hiring_snapshot = HiringSnapshot()
@@ -1,40 +1,39 @@
 # dbchallenge/dbdata/backup.py
 
+import bz2
 import os
 import json
+import logging
+import lzma
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import avro.schema
+from avro import datafile
 from avro.datafile import DataFileWriter, DataFileReader
 from avro.io import DatumWriter, DatumReader
 from django.conf import settings
 from datetime import datetime
 from .models import Department, Job, HiredEmployee
+from .cache import bump_table_versions, get_table_versions, stamp_row_versions
+from .formats import iter_chunks, to_text
+from .ingest import INGEST_COPY, MODE_UPSERT, copy_instances, copy_supported, write_instances
+from .partitions import delete_hires_by_year, ensure_employee_partitions, truncate_hired_employees
+from .rollups import format_year_ranges, hired_in, parse_year_ranges, rebuild_hiring_summary
 
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Max, Min
 
+logger = logging.getLogger(__name__)
 
 
-def ensure_backup_dir():
-    """Ensure the backup directory exists"""
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-    return backup_dir
-
-
-def get_timestamp():
-    """Get a timestamp string for filenames"""
-    return datetime.now().strftime('%Y%m%d_%H%M%S')
-
-
-def backup_department_table():
-    """Backup Department table to AVRO format"""
-    backup_dir = ensure_backup_dir()
-    timestamp = get_timestamp()
-    filename = os.path.join(backup_dir, f'department_backup_{timestamp}.avro')
-    
-    # Define the Avro schema based on the Department model
-    schema_json = {
+# Avro schemas of the tables, based on their models. The bulk endpoints accept
+# bodies written with the same schemas.
+SCHEMAS = {
+    "department": {
         "namespace": "dbdata",
         "type": "record",
         "name": "Department",
@@ -42,34 +41,8 @@ def backup_department_table():
             {"name": "id", "type": "int"},
             {"name": "department", "type": "string"}
         ]
-    }
-    
-    schema = avro.schema.parse(json.dumps(schema_json))
-    
-    # Create a writer
-    with open(filename, 'wb') as f:
-        writer = DataFileWriter(f, DatumWriter(), schema)
-        
-        # Add each Department record to the AVRO file
-        for dept in Department.objects.all():
-            writer.append({
-                "id": dept.id,
-                "department": dept.department
-            })
-        
-        writer.close()
-    
-    return filename
-
-
-def backup_job_table():
-    """Backup Job table to AVRO format"""
-    backup_dir = ensure_backup_dir()
-    timestamp = get_timestamp()
-    filename = os.path.join(backup_dir, f'job_backup_{timestamp}.avro')
-    
-    # Define the Avro schema based on the Job model
-    schema_json = {
+    },
+    "job": {
         "namespace": "dbdata",
         "type": "record",
         "name": "Job",
@@ -77,34 +50,8 @@ def backup_job_table():
             {"name": "id", "type": "int"},
             {"name": "job", "type": "string"}
         ]
-    }
-    
-    schema = avro.schema.parse(json.dumps(schema_json))
-    
-    # Create a writer
-    with open(filename, 'wb') as f:
-        writer = DataFileWriter(f, DatumWriter(), schema)
-        
-        # Add each Job record to the AVRO file
-        for job in Job.objects.all():
-            writer.append({
-                "id": job.id,
-                "job": job.job
-            })
-        
-        writer.close()
-    
-    return filename
-
-
-def backup_hired_employee_table():
-    """Backup HiredEmployee table to AVRO format"""
-    backup_dir = ensure_backup_dir()
-    timestamp = get_timestamp()
-    filename = os.path.join(backup_dir, f'hired_employee_backup_{timestamp}.avro')
-    
-    # Define the Avro schema based on the HiredEmployee model
-    schema_json = {
+    },
+    "hired_employee": {
         "namespace": "dbdata",
         "type": "record",
         "name": "HiredEmployee",
@@ -115,40 +62,472 @@ def backup_hired_employee_table():
             {"name": "department_id", "type": "int"},
             {"name": "job_id", "type": "int"}
         ]
-    }
-    
-    schema = avro.schema.parse(json.dumps(schema_json))
-    
-    # Create a writer
+    },
+}
+
+
+# Avro metadata key with the year ranges of a year-scoped backup
+YEARS_META = "dbdata.years"
+
+# Avro metadata key with the data version of the table in the base of an incremental backup
+AFTER_VERSION_META = "dbdata.after_version"
+
+# Backup manifests are saved as manifest_<timestamp>.json
+MANIFEST_PREFIX = "manifest_"
+
+
+def ensure_backup_dir():
+    """Ensure the backup directory exists"""
+    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+    return backup_dir
+
+
+def get_timestamp():
+    """Get a timestamp string for filenames, precise enough for backups taken in a row"""
+    return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+
+# Compression of the codecs that take a level: (valid levels, compress(data, level))
+COMPRESSION_LEVELS = {
+    datafile.DEFLATE_CODEC: (range(0, 10), lambda data, level: deflate(data, level)),
+    datafile.BZIP2_CODEC: (range(1, 10), lambda data, level: bz2.compress(data, level)),
+    datafile.XZ_CODEC: (range(0, 10), lambda data, level: lzma.compress(data, preset=level)),
+    datafile.ZSTANDARD_CODEC: (range(1, 23), lambda data, level: zstd_compress(data, level)),
+}
+
+# Avro metadata keys with the writer options
+LEVEL_META = "dbdata.compression_level"
+SYNC_INTERVAL_META = "dbdata.sync_interval"
+
+
+def deflate(data, level):
+    """Raw deflate stream, as the Avro deflate codec expects"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def zstd_compress(data, level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class BackupFileWriter(DataFileWriter):
+    """
+    DataFileWriter with a compression level and a sync interval, the
+    uncompressed size of a block that triggers writing it. Counts the bytes
+    it encodes, to report the compression ratio.
+    """
+
+    def __init__(self, writer, datum_writer, writer_schema, codec, level=None, sync_interval=datafile.SYNC_INTERVAL):
+        super().__init__(writer, datum_writer, writer_schema, codec=codec)
+        self.level = level
+        self.sync_interval = sync_interval
+        self.encoded_bytes = 0
+
+    def append(self, datum):
+        self.datum_writer.write(datum, self.buffer_encoder)
+        self._block_count += 1
+        if self._buffer_writer.tell() >= self.sync_interval:
+            self._WriteBlock()
+
+    def _WriteBlock(self):
+        if self.block_count <= 0:
+            return super()._WriteBlock()
+
+        data = self._buffer_writer.getvalue()
+        self.encoded_bytes += len(data)
+        codec = self.GetMeta(datafile.CODEC_KEY).decode()
+        if self.level is None or codec not in COMPRESSION_LEVELS:
+            return super()._WriteBlock()
+
+        if not self._header_written:
+            self._WriteHeader()
+        compressed = COMPRESSION_LEVELS[codec][1](data, self.level)
+        self.encoder.write_long(self.block_count)
+        self.encoder.write_long(len(compressed))
+        self.writer.write(compressed)
+        self.writer.write(self.sync_marker)
+
+        self._buffer_writer.seek(0)
+        self._buffer_writer.truncate()
+        self._block_count = 0
+
+
+def backup_options(codec=None, level=None, sync_interval=None):
+    """
+    Validated options of the AVRO writer, from the given values or the
+    BACKUP_CODEC, BACKUP_COMPRESSION_LEVEL and BACKUP_SYNC_INTERVAL settings.
+    Raises ValueError for an unknown codec or an invalid level or interval.
+    """
+    codec = codec or settings.BACKUP_CODEC
+    if codec not in datafile.VALID_CODECS:
+        raise ValueError(f"Unknown or unavailable codec: {codec}. Use one of: {', '.join(sorted(datafile.VALID_CODECS))}")
+
+    if level is None or level == "":
+        # The setting applies to the codecs that take a level
+        level = settings.BACKUP_COMPRESSION_LEVEL if codec in COMPRESSION_LEVELS else None
+    elif codec not in COMPRESSION_LEVELS:
+        raise ValueError(f"The {codec} codec has no compression level")
+    if level is not None:
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            level = None
+        if level not in COMPRESSION_LEVELS[codec][0]:
+            levels = COMPRESSION_LEVELS[codec][0]
+            raise ValueError(f"The level of the {codec} codec must be between {levels[0]} and {levels[-1]}")
+
+    try:
+        sync_interval = int(sync_interval or settings.BACKUP_SYNC_INTERVAL)
+    except ValueError:
+        sync_interval = 0
+    if sync_interval <= 0:
+        raise ValueError("The sync interval must be a positive number of bytes")
+
+    return {"codec": codec, "level": level, "sync_interval": sync_interval}
+
+
+def metadata_file(filename):
+    """Sidecar JSON file with the options and statistics of a backup file"""
+    return f"{os.path.splitext(filename)[0]}.meta.json"
+
+
+def write_avro_file(table, filename, rows, meta=None, options=None):
+    """
+    Write rows, tuples of the fields of the schema of a table, to an AVRO file
+    with the writer options of backup_options. The options, row count, sizes,
+    compression ratio and throughput are saved to the metadata_file of the
+    backup, and returned.
+    """
+    options = options or backup_options()
+    schema = avro.schema.parse(json.dumps(SCHEMAS[table]))
+    fields = schema_fields(table)
+
+    start = time.time()
+    written = 0
     with open(filename, 'wb') as f:
-        writer = DataFileWriter(f, DatumWriter(), schema)
-        
-        # Add each HiredEmployee record to the AVRO file
-        for employee in HiredEmployee.objects.all():
-            writer.append({
-                "id": employee.id,
-                "name": employee.name if employee.name else None,
-                "datetime": employee.datetime.isoformat() if employee.datetime else None,
-                "department_id": employee.department_id.id,
-                "job_id": employee.job_id.id
-            })
-        
+        writer = BackupFileWriter(f, DatumWriter(), schema, **options)
+        for name, value in (meta or {}).items():
+            writer.SetMeta(name, value)
+        if options["level"] is not None:
+            writer.SetMeta(LEVEL_META, str(options["level"]))
+        writer.SetMeta(SYNC_INTERVAL_META, str(options["sync_interval"]))
+
+        for row in rows:
+            # Datetimes are stored as ISO 8601 strings
+            writer.append({field: to_text(value) for field, value in zip(fields, row)})
+            written += 1
+
         writer.close()
-    
-    return filename
 
+    elapsed = time.time() - start
+    file_bytes = os.path.getsize(filename)
+    stats = dict(
+        options,
+        table=table,
+        file=filename,
+        rows=written,
+        encoded_bytes=writer.encoded_bytes,
+        file_bytes=file_bytes,
+        compression_ratio=round(writer.encoded_bytes / file_bytes, 3) if file_bytes else None,
+        seconds=round(elapsed, 3),
+        rows_per_second=round(written / elapsed) if elapsed else None,
+        megabytes_per_second=round(writer.encoded_bytes / elapsed / 1e6, 3) if elapsed else None,
+    )
+    with open(metadata_file(filename), "w") as f:
+        json.dump(stats, f, indent=2)
 
-def backup_all_tables():
-    """Backup all tables to AVRO format"""
-    dept_file = backup_department_table()
-    job_file = backup_job_table()
-    emp_file = backup_hired_employee_table()
-    
+    return stats
+
+
+def schema_fields(table):
+    """Field names of the AVRO schema of a table, which are also its column names"""
+    return [field["name"] for field in SCHEMAS[table]["fields"]]
+
+
+def write_table_backup(table, queryset, filename, meta=None, options=None):
+    """
+    Write the rows of a queryset to an AVRO file with the schema of a table.
+
+    Rows are read as raw column tuples in chunks of BACKUP_CHUNK_SIZE (a
+    server-side cursor on PostgreSQL), so foreign keys are written from their
+    columns without loading related objects and memory does not grow with the
+    table. Returns the statistics of write_avro_file.
+    """
+    rows = queryset.order_by("id").values_list(*schema_fields(table)).iterator(chunk_size=settings.BACKUP_CHUNK_SIZE)
+    return write_avro_file(table, filename, rows, meta, options)
+
+
+def id_ranges(queryset, size):
+    """Half-open [first, last) id ranges of at most size ids that cover the rows of a queryset"""
+    bounds = queryset.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return []
+    return [(first, min(first + size, bounds["last"] + 1)) for first in range(bounds["first"], bounds["last"] + 1, size)]
+
+
+def fetch_id_range(table, queryset, id_range):
+    """Rows of a queryset in an id range, as tuples of the fields of the schema of a table"""
+    first, last = id_range
+    return list(
+        queryset.filter(id__gte=first, id__lt=last).order_by("id").values_list(*schema_fields(table))
+    )
+
+
+def iter_in_order(executor, function, items, window):
+    """
+    Run function over items in an executor and yield the results in the order
+    of the items, with at most window calls submitted ahead of the consumer
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def export_snapshot():
+    """
+    Start a REPEATABLE READ transaction on PostgreSQL and export its snapshot,
+    so other connections can read the same data. Must run first in a
+    transaction. Returns None on other databases.
+    """
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("SELECT pg_export_snapshot()")
+        return cursor.fetchone()[0]
+
+
+def in_snapshot(snapshot_id, function):
+    """Wrap function so it runs in a worker thread inside a transaction on an exported snapshot"""
+    def run(*args):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                    cursor.execute("SET TRANSACTION SNAPSHOT %s", [snapshot_id])
+                return function(*args)
+        finally:
+            # Every worker thread has its own connection
+            connection.close()
+
+    return run
+
+
+def backup_filenames(year_ranges=None, incremental=False):
+    """Backup file of each table for a new backup, and of its manifest"""
+    backup_dir = ensure_backup_dir()
+    timestamp = get_timestamp()
+    suffix = '_inc' if incremental else ''
+    employee_suffix = f'_y{format_year_ranges(year_ranges)}' if year_ranges else suffix
     return {
-        "department": dept_file,
-        "job": job_file,
-        "hired_employee": emp_file
+        "department": os.path.join(backup_dir, f'department_backup_{timestamp}{suffix}.avro'),
+        "job": os.path.join(backup_dir, f'job_backup_{timestamp}{suffix}.avro'),
+        "hired_employee": os.path.join(backup_dir, f'hired_employee_backup_{timestamp}{employee_suffix}.avro'),
+        "manifest": os.path.join(backup_dir, f'{MANIFEST_PREFIX}{timestamp}.json'),
+    }
+
+
+def backup_querysets(year_ranges=None, after_versions=None):
+    """
+    Rows of each table to back up, and the metadata of its file. With the
+    table versions of a base backup, only the rows written since.
+    """
+    querysets = {
+        "department": (Department.objects.all(), {}),
+        "job": (Job.objects.all(), {}),
+        "hired_employee": (HiredEmployee.objects.all(), {}),
+    }
+    if year_ranges:
+        employees, meta = querysets["hired_employee"]
+        # Half-open datetime ranges: only the partitions of those years are read
+        querysets["hired_employee"] = (employees.filter(hired_in(year_ranges)), meta)
+        # Restoring these files replaces only the employees of these years, and
+        # upserts the departments and jobs that the other years still refer to
+        for queryset, meta in querysets.values():
+            meta[YEARS_META] = format_year_ranges(year_ranges)
+    if after_versions:
+        for table, (queryset, meta) in querysets.items():
+            # Restoring this file upserts its rows instead of replacing the table
+            meta[AFTER_VERSION_META] = str(after_versions[table])
+            querysets[table] = (queryset.filter(row_version__gt=after_versions[table]), meta)
+    return querysets
+
+
+def table_versions(querysets):
+    """Data version of the table of each queryset, which its rows are stamped with up to"""
+    versions = dict(get_table_versions([queryset.model for queryset, _ in querysets.values()]))
+    return {table: versions[queryset.model._meta.db_table] for table, (queryset, _) in querysets.items()}
+
+
+def backup_department_table():
+    """Backup Department table to AVRO format"""
+    filename = backup_filenames()["department"]
+    write_table_backup("department", Department.objects.all(), filename)
+    return filename
+
+
+def backup_job_table():
+    """Backup Job table to AVRO format"""
+    filename = backup_filenames()["job"]
+    write_table_backup("job", Job.objects.all(), filename)
+    return filename
+
+
+def backup_hired_employee_table(year_ranges=None):
+    """Backup HiredEmployee table to AVRO format, or only the employees hired in the given years"""
+    filename = backup_filenames(year_ranges)["hired_employee"]
+    employees, meta = backup_querysets(year_ranges)["hired_employee"]
+    write_table_backup("hired_employee", employees, filename, meta)
+    return filename
+
+
+@transaction.atomic
+def backup_all_tables(year_ranges=None, options=None, incremental=False):
+    """
+    Backup all tables to AVRO format from one consistent view of the data,
+    and write the manifest of the backup. Returns the manifest.
+
+    On PostgreSQL the backup runs in a REPEATABLE READ transaction whose
+    snapshot is exported to a pool of BACKUP_WORKERS threads: the department
+    and job files are written concurrently, and the employees are fetched in
+    id ranges of BACKUP_RANGE_SIZE by the workers while this thread appends
+    them to their file in id order. Elsewhere the tables are written one
+    after another in the transaction. options are those of backup_options.
+
+    The manifest records the data version of each table read by the backup.
+    Writes stamp their rows with the next version and keep it locked until
+    they commit, so the backup holds every row stamped up to those versions
+    and none above. An incremental backup holds the rows stamped above the
+    versions of the latest backup of every year, full or incremental, which
+    becomes its base: the rows inserted or updated since, whatever their id.
+    """
+    base = None
+    if incremental:
+        if year_ranges:
+            raise ValueError("An incremental backup covers every year")
+        base = latest_manifest()
+        if base is None:
+            raise ValueError("There is no backup to take an incremental backup from")
+        if "versions" not in base:
+            raise ValueError("The latest backup has no table versions, take a full backup first")
+
+    snapshot_id = export_snapshot()
+    filenames = backup_filenames(year_ranges, incremental)
+    querysets = backup_querysets(year_ranges, base["versions"] if base else None)
+    # Read in the snapshot of the backup, before its rows
+    versions = table_versions(querysets)
+
+    if snapshot_id is None or settings.BACKUP_WORKERS <= 1:
+        stats = {
+            table: write_table_backup(table, queryset, filenames[table], meta, options)
+            for table, (queryset, meta) in querysets.items()
+        }
+    else:
+        stats = parallel_backup(snapshot_id, querysets, filenames, options)
+
+    manifest = {
+        "manifest": filenames["manifest"],
+        "created": timezone.now().isoformat(),
+        "kind": "incremental" if incremental else "full",
+        "base": base["manifest"] if base else None,
+        "years": format_year_ranges(year_ranges) if year_ranges else None,
+        "files": {table: filenames[table] for table in querysets},
+        "rows": {table: table_stats["rows"] for table, table_stats in stats.items()},
+        "versions": versions,
     }
+    with open(filenames["manifest"], "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def parallel_backup(snapshot_id, querysets, filenames, options):
+    """Write the backup files with a pool of threads on an exported snapshot. Returns their statistics."""
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=settings.BACKUP_WORKERS, thread_name_prefix="backup") as executor:
+        small_tables = {
+            table: executor.submit(
+                in_snapshot(snapshot_id, write_table_backup), table, queryset, filenames[table], meta, options
+            )
+            for table, (queryset, meta) in querysets.items()
+            if table != "hired_employee"
+        }
+
+        employees, meta = querysets["hired_employee"]
+        chunks = iter_in_order(
+            executor,
+            in_snapshot(snapshot_id, lambda id_range: fetch_id_range("hired_employee", employees, id_range)),
+            id_ranges(employees, settings.BACKUP_RANGE_SIZE),
+            settings.BACKUP_WORKERS * 2,
+        )
+        stats = {
+            "hired_employee": write_avro_file(
+                "hired_employee", filenames["hired_employee"], (row for chunk in chunks for row in chunk), meta, options
+            )
+        }
+
+        for table, future in small_tables.items():
+            stats[table] = future.result()
+
+    logger.debug("Parallel backup of %d employees in %.1fs with %d workers",
+                 stats["hired_employee"]["rows"], time.time() - start, settings.BACKUP_WORKERS)
+    return stats
+
+
+def list_manifests():
+    """Manifests of the backups, latest first"""
+    backup_dir = ensure_backup_dir()
+    manifests = []
+    for filename in sorted(os.listdir(backup_dir), reverse=True):
+        if filename.startswith(MANIFEST_PREFIX) and filename.endswith('.json'):
+            with open(os.path.join(backup_dir, filename)) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+
+def latest_manifest():
+    """Manifest of the latest backup of every year, the base of the next incremental backup"""
+    for manifest in list_manifests():
+        if not manifest["years"]:
+            return manifest
+    return None
+
+
+def manifest_chain(manifest_file):
+    """Manifests from the full backup at the root of a manifest's chain up to the manifest"""
+    chain = []
+    while manifest_file:
+        if not os.path.exists(manifest_file):
+            raise FileNotFoundError(f"Backup manifest not found: {manifest_file}")
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        chain.append(manifest)
+        manifest_file = manifest["base"]
+    return chain[::-1]
+
+
+@transaction.atomic
+def restore_backup(manifest_file):
+    """
+    Restore every table from a backup manifest, replaying its chain: the
+    full backup, then each incremental backup on top of it. Returns the
+    number of rows of each table.
+    """
+    chain = manifest_chain(manifest_file)
+    restored = {}
+    # Departments and jobs first: replacing them deletes their employees
+    for table in ("department", "job", "hired_employee"):
+        for manifest in chain:
+            restored[table] = restore_table(table, manifest["files"][table])
+    return restored
 
 
 def list_backups():
@@ -176,84 +555,133 @@ def list_backups():
     return backups
 
 
-@transaction.atomic
-def restore_department_table(backup_file):
-    """Restore Department table from AVRO backup"""
+def is_incremental(reader):
+    """Whether an AVRO backup file was written by an incremental backup"""
+    return bool(reader.GetMeta(AFTER_VERSION_META))
+
+
+def is_year_scoped(reader):
+    """Whether an AVRO backup file was written by a backup of some years"""
+    return bool(reader.GetMeta(YEARS_META))
+
+
+def restore_records(model, records, to_instance, upsert=False):
+    """
+    Insert the records of a backup in batches of RESTORE_BATCH_SIZE, built
+    with their raw foreign key ids, with COPY on PostgreSQL when
+    RESTORE_METHOD is "copy" and bulk_create otherwise. With upsert, as for
+    an incremental backup, the records are upserted instead, with the
+    HiringSummary rollup kept up to date like the bulk endpoints. The rows
+    are then stamped with a new data version of the table. Any invalid row
+    fails the restore. Returns the number of rows written.
+    """
+    use_copy = settings.RESTORE_METHOD == INGEST_COPY and copy_supported()
+    ids = []
+    for batch in iter_chunks(records, settings.RESTORE_BATCH_SIZE):
+        instances = [to_instance(record) for record in batch]
+        if model is HiredEmployee:
+            # New years need their partition first
+            ensure_employee_partitions(instances)
+
+        if upsert:
+            write_instances(model, instances, use_copy=False, mode=MODE_UPSERT)
+        elif use_copy:
+            copy_instances(model, instances)
+        else:
+            model.objects.bulk_create(instances)
+        ids.extend(instance.pk for instance in instances)
+
+    # Stamped last: the version stays locked until the restore commits
+    stamp_row_versions(model, ids)
+    return len(ids)
+
+
+def open_backup(backup_file):
+    """Open an AVRO backup file for reading"""
     # First check if the file exists
     if not os.path.exists(backup_file):
         raise FileNotFoundError(f"Backup file not found: {backup_file}")
-    
-    # Clear existing records
-    Department.objects.all().delete()
-    
-    # Read from AVRO file and create new records
-    with open(backup_file, 'rb') as f:
-        reader = DataFileReader(f, DatumReader())
-        for record in reader:
-            Department.objects.create(
-                id=record['id'],
-                department=record['department']
-            )
-        reader.close()
-    
+    return DataFileReader(open(backup_file, 'rb'), DatumReader())
+
+
+@transaction.atomic
+def restore_department_table(backup_file):
+    """Restore Department table from AVRO backup"""
+    with open_backup(backup_file) as reader:
+        # Clear existing records, unless the rows of an incremental or year-scoped
+        # backup are upserted: deleting departments would also delete their employees
+        upsert = is_incremental(reader) or is_year_scoped(reader)
+        if not upsert:
+            Department.objects.all().delete()
+        restore_records(
+            Department,
+            reader,
+            lambda record: Department(id=record['id'], department=record['department']),
+            upsert,
+        )
+
+    if not upsert:
+        # Deleting the departments also deleted their employees
+        bump_table_versions(HiredEmployee)
+
     return Department.objects.count()
 
 
 @transaction.atomic
 def restore_job_table(backup_file):
     """Restore Job table from AVRO backup"""
-    # First check if the file exists
-    if not os.path.exists(backup_file):
-        raise FileNotFoundError(f"Backup file not found: {backup_file}")
-    
-    # Clear existing records
-    Job.objects.all().delete()
-    
-    # Read from AVRO file and create new records
-    with open(backup_file, 'rb') as f:
-        reader = DataFileReader(f, DatumReader())
-        for record in reader:
-            Job.objects.create(
-                id=record['id'],
-                job=record['job']
-            )
-        reader.close()
-    
+    with open_backup(backup_file) as reader:
+        # Clear existing records, unless the rows of an incremental or year-scoped
+        # backup are upserted: deleting jobs would also delete their employees
+        upsert = is_incremental(reader) or is_year_scoped(reader)
+        if not upsert:
+            Job.objects.all().delete()
+        restore_records(
+            Job,
+            reader,
+            lambda record: Job(id=record['id'], job=record['job']),
+            upsert,
+        )
+
+    if not upsert:
+        # Deleting the jobs also deleted their employees
+        bump_table_versions(HiredEmployee)
+
     return Job.objects.count()
 
 
+def employee_from_record(record):
+    """HiredEmployee of a backup record, with its foreign keys as raw ids"""
+    return HiredEmployee(
+        id=record['id'],
+        name=record['name'],
+        datetime=parse_datetime(record['datetime']) if record['datetime'] else None,
+        department_id_id=record['department_id'],
+        job_id_id=record['job_id'],
+    )
+
+
 @transaction.atomic
 def restore_hired_employee_table(backup_file):
     """Restore HiredEmployee table from AVRO backup"""
-    # First check if the file exists
-    if not os.path.exists(backup_file):
-        raise FileNotFoundError(f"Backup file not found: {backup_file}")
-    
-    # Clear existing records
-    HiredEmployee.objects.all().delete()
-    
-    # Read from AVRO file and create new records
-    with open(backup_file, 'rb') as f:
-        reader = DataFileReader(f, DatumReader())
-        for record in reader:
-            # Get related objects
-            department = Department.objects.get(id=record['department_id'])
-            job = Job.objects.get(id=record['job_id'])
-            
-            # Parse datetime if it exists
-            datetime_val = None
-            if record['datetime']:
-                datetime_val = parse_datetime(record['datetime'])
-            
-            HiredEmployee.objects.create(
-                id=record['id'],
-                name=record['name'],
-                datetime=datetime_val,
-                department_id=department,
-                job_id=job
-            )
-        reader.close()
-    
+    with open_backup(backup_file) as reader:
+        # Clear existing records: only the years of a year-scoped backup, and
+        # none for an incremental backup, whose rows are upserted
+        year_ranges = reader.GetMeta(YEARS_META)
+        incremental = is_incremental(reader)
+        if year_ranges:
+            year_ranges = parse_year_ranges(year_ranges.decode())
+            delete_hires_by_year(year_ranges)
+        elif not incremental:
+            truncate_hired_employees()
+
+        restore_records(HiredEmployee, reader, employee_from_record, incremental)
+
+    if not incremental:
+        # The restored rows replace the table or its years, so the rollups are
+        # recomputed once instead of being updated row by row
+        rebuild_hiring_summary(year_ranges)
+
     return HiredEmployee.objects.count()
 
 
@@ -0,0 +1,169 @@
+# dbchallenge/dbdata/cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from .models import TableVersion
+
+
+def bump_table_versions(*models):
+    """
+    Increment the data version of the tables of the given models.
+
+    Runs in the transaction of the write, so the new version becomes visible
+    together with the rows. Uses the same upsert statement as the rollups.
+    """
+    table = connection.ops.quote_name(TableVersion._meta.db_table)
+    sql = f"""
+        INSERT INTO {table} (name, version)
+        VALUES (%s, 1)
+        ON CONFLICT (name)
+        DO UPDATE SET version = {table}.version + 1
+    """
+    names = sorted({model._meta.db_table for model in models})
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(name,) for name in names])
+
+
+def next_table_version(model):
+    """
+    Bump the data version of a model's table and return it, to stamp the
+    rows written by the transaction as their row_version. The bump locks the
+    version row until the transaction ends, so writers take their versions
+    in commit order and a transaction that sees version V sees every row
+    stamped up to V and none above it. Called last in the write, so other
+    writers only wait on the lock from here to the commit.
+    """
+    bump_table_versions(model)
+    return TableVersion.objects.get(name=model._meta.db_table).version
+
+
+def stamp_row_versions(model, ids):
+    """
+    Stamp the rows just written with the given ids with the next data
+    version of their table, in chunks of BULK_INGEST_CHUNK_SIZE ids.
+    Returns the version.
+    """
+    row_version = next_table_version(model)
+    ids = list(ids)
+    for start in range(0, len(ids), settings.BULK_INGEST_CHUNK_SIZE):
+        model.objects.filter(pk__in=ids[start:start + settings.BULK_INGEST_CHUNK_SIZE]).update(row_version=row_version)
+    return row_version
+
+
+def get_table_versions(models):
+    """Data versions of the tables of the given models, 0 for a table never written"""
+    names = sorted({model._meta.db_table for model in models})
+    versions = dict(TableVersion.objects.filter(name__in=names).values_list("name", "version"))
+    return tuple((name, versions.get(name, 0)) for name in names)
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of response bodies, bounded by number of entries and
+    total size in bytes. Shared by the threads of the process.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, content, content_type):
+        if len(content) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+
+            self.entries[key] = (content, content_type)
+            self.size += len(content)
+
+            # Evict the least recently used entries
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def tee_into_cache(key, streaming_content, content_type):
+    """Pass the chunks of a streaming response through, caching the body once it is complete"""
+    chunks = []
+    size = 0
+    for chunk in streaming_content:
+        if chunks is not None:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > response_cache.max_bytes:
+                # Too big to be cached: stop buffering
+                chunks = None
+        yield chunk
+
+    if chunks is not None:
+        response_cache.set(key, b"".join(chunks), content_type)
+
+
+def versioned_cache(*models):
+    """
+    Cache the successful responses of a GET handler by path, query parameters
+    and data version of the tables it reads. Entries of older versions are
+    never hit again and age out of the LRU. The key is also sent as ETag, so
+    a client holding the current version gets a 304 without a body.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            params = sorted((name, values) for name, values in request.query_params.lists())
+            key = repr((request.path, params, get_table_versions(models)))
+            etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+            if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+            if etag in if_none_match or "*" in if_none_match:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+
+            cached = response_cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = get(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if response.streaming:
+                    response.streaming_content = tee_into_cache(key, response.streaming_content, response["Content-Type"])
+                else:
+                    response_cache.set(key, response.content, response["Content-Type"])
+
+            response["ETag"] = etag
+            # Clients may keep the body but must revalidate it with If-None-Match
+            response["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
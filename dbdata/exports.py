@@ -0,0 +1,57 @@
+# dbchallenge/dbdata/exports.py
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+from .models import Department, Job, HiredEmployee
+
+# Model, exported columns and their types (see formats.arrow_schema) of each table
+EXPORT_TABLES = {
+    "department": (Department, ["id", "department"], ["int", "str"]),
+    "job": (Job, ["id", "job"], ["int", "str"]),
+    "hired_employee": (
+        HiredEmployee,
+        ["id", "name", "datetime", "department_id", "job_id"],
+        ["int", "str", "datetime", "int", "int"],
+    ),
+}
+
+
+def parse_datetime_param(name, value):
+    """Parse an ISO 8601 datetime or date of the query string, in the current time zone when naive"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid {name}: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(table, params):
+    """
+    Columns, column types and rows of a table to export, ordered by id, as a
+    values_list queryset.
+
+    Employees can be filtered with `from`/`to` (a half-open datetime range) and
+    a comma separated list of `department_id`s. Raises ValueError for invalid
+    filters.
+    """
+    model, columns, types = EXPORT_TABLES[table]
+    queryset = model.objects.order_by("id")
+
+    if model is HiredEmployee:
+        if params.get("from"):
+            queryset = queryset.filter(datetime__gte=parse_datetime_param("from", params["from"]))
+        if params.get("to"):
+            queryset = queryset.filter(datetime__lt=parse_datetime_param("to", params["to"]))
+        if params.get("department_id"):
+            try:
+                department_ids = [int(value) for value in params["department_id"].split(",")]
+            except ValueError:
+                raise ValueError(f"Invalid department_id: {params['department_id']!r}")
+            queryset = queryset.filter(department_id__in=department_ids)
+
+    return columns, types, queryset.values_list(*columns)
@@ -0,0 +1,170 @@
+# dbchallenge/dbdata/formats.py
+
+import csv
+import json
+from datetime import date, datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Arrow and Parquet output is only offered where pyarrow is installed
+    pyarrow = None
+
+# Rows encoded per chunk of a streamed response
+ENCODE_CHUNK_SIZE = 1000
+
+# Rows per Arrow record batch and per Parquet row group
+COLUMNAR_CHUNK_SIZE = 65536
+
+# Formats that need pyarrow
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+
+class Echo:
+    """File-like object whose write returns the value, so csv.writer can encode rows one at a time"""
+
+    def write(self, value):
+        return value
+
+
+class ChunkSink:
+    """
+    Write-only file that keeps what was written until it is drained, so the
+    output of a pyarrow writer can be streamed. Tracks its position, which
+    the Parquet footer refers to.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def to_text(value):
+    """Text of a value in CSV and NDJSON output: dates as ISO 8601"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_chunks(rows, size=ENCODE_CHUNK_SIZE):
+    """Group an iterable of rows into lists of at most size rows"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(columns, rows, types=None):
+    """Encode rows as CSV with a header line, null values as empty fields"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for chunk in iter_chunks(rows):
+        yield "".join(writer.writerow([to_text(value) for value in row]) for row in chunk)
+
+
+def iter_ndjson(columns, rows, types=None):
+    """Encode rows as newline delimited JSON objects"""
+    encoder = json.JSONEncoder(separators=(",", ":"), default=to_text)
+    for chunk in iter_chunks(rows):
+        yield "".join(encoder.encode(dict(zip(columns, row))) + "\n" for row in chunk)
+
+
+def iter_json(columns, rows, types=None):
+    """Encode rows as a JSON array of objects"""
+    encoder = json.JSONEncoder(separators=(",", ":"), default=to_text)
+    yield "["
+    separator = ""
+    for chunk in iter_chunks(rows):
+        yield separator + ",".join(encoder.encode(dict(zip(columns, row))) for row in chunk)
+        separator = ","
+    yield "]"
+
+
+def arrow_schema(columns, types):
+    """Arrow schema of columns typed "int", "float", "str", "date" or "datetime" (UTC)"""
+    arrow_types = {
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "str": pyarrow.string(),
+        "date": pyarrow.date32(),
+        "datetime": pyarrow.timestamp("us", tz="UTC"),
+    }
+    return pyarrow.schema([(column, arrow_types[column_type]) for column, column_type in zip(columns, types)])
+
+
+def iter_record_batches(schema, rows):
+    """Transpose chunks of rows into Arrow record batches, one array per column"""
+    for chunk in iter_chunks(rows, COLUMNAR_CHUNK_SIZE):
+        arrays = [
+            pyarrow.array(values, type=field.type)
+            for values, field in zip(zip(*chunk), schema)
+        ]
+        yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_arrow(columns, rows, types):
+    """Encode rows as an Arrow IPC stream, one record batch per chunk"""
+    schema = arrow_schema(columns, types)
+    sink = ChunkSink()
+    with pyarrow.ipc.new_stream(pyarrow.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in iter_record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(columns, rows, types):
+    """Encode rows as a Parquet file, one row group per chunk"""
+    schema = arrow_schema(columns, types)
+    sink = ChunkSink()
+    with pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in iter_record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+# Streamed output formats: (encoder, content type)
+FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "json": (iter_json, "application/json"),
+    "arrow": (iter_arrow, "application/vnd.apache.arrow.stream"),
+    "parquet": (iter_parquet, "application/vnd.apache.parquet"),
+}
+
+
+def check_format(name, formats):
+    """
+    Raise ValueError for a format that is not one of formats, and LookupError
+    for a columnar format when pyarrow is not installed.
+    """
+    if name not in formats:
+        raise ValueError(f"Unknown format: {name}. Use one of: {', '.join(formats)}")
+    if name in COLUMNAR_FORMATS and pyarrow is None:
+        raise LookupError(f"The {name} format needs pyarrow, which is not installed")
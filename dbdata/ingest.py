@@ -0,0 +1,262 @@
+# dbchallenge/dbdata/ingest.py
+
+import io
+from collections import Counter
+from datetime import datetime
+from django.conf import settings
+from django.db import DataError, IntegrityError, connection, transaction
+from .cache import stamp_row_versions
+from .models import Department, Job, HiredEmployee
+from .partitions import ensure_employee_partitions, is_partitioned
+from .rollups import existing_hires, hires_of, update_hiring_summary
+
+INGEST_BULK_CREATE = "bulk_create"
+INGEST_COPY = "copy"
+INGEST_METHODS = (INGEST_BULK_CREATE, INGEST_COPY)
+
+MODE_INSERT = "insert"
+MODE_IGNORE = "ignore"
+MODE_UPSERT = "upsert"
+INGEST_MODES = (MODE_INSERT, MODE_IGNORE, MODE_UPSERT)
+
+
+def to_int(value):
+    """Parse an id coming from a payload, returning None when it is not an integer"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_hired_employee_foreign_keys(rows):
+    """
+    Replace the department_id/job_id of each row with its model instance.
+
+    The distinct ids of the whole payload are checked with one query per table,
+    so the cost does not grow with the number of rows. Returns the list of
+    offending rows as dicts with the row index and the failing fields.
+    """
+    department_ids = set()
+    job_ids = set()
+    parsed = []
+    for row in rows:
+        department_id = to_int(row.get("department_id"))
+        job_id = to_int(row.get("job_id"))
+        department_ids.add(department_id)
+        job_ids.add(job_id)
+        parsed.append((department_id, job_id))
+
+    departments = Department.objects.in_bulk(department_ids - {None})
+    jobs = Job.objects.in_bulk(job_ids - {None})
+
+    errors = []
+    for index, (row, (department_id, job_id)) in enumerate(zip(rows, parsed)):
+        department = departments.get(department_id)
+        job = jobs.get(job_id)
+
+        if department and job:
+            row["department_id"] = department
+            row["job_id"] = job
+            continue
+
+        row_errors = {"index": index}
+        if department is None:
+            row_errors["department_id"] = f"Department {row.get('department_id')!r} does not exist"
+        if job is None:
+            row_errors["job_id"] = f"Job {row.get('job_id')!r} does not exist"
+        errors.append(row_errors)
+
+    return errors
+
+
+def copy_supported():
+    """COPY FROM STDIN is only available on PostgreSQL through psycopg2"""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy_expert")
+
+
+def copy_value(value):
+    """Format a python value as a field of the COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_instances(model, instances):
+    """Stream model instances into their table with COPY ... FROM STDIN"""
+    fields = model._meta.concrete_fields
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+
+    buffer = io.StringIO()
+    for instance in instances:
+        buffer.write("\t".join(copy_value(getattr(instance, field.attname)) for field in fields))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.cursor.copy_expert(sql, buffer)
+
+
+def first_of_each_id(instances, skip=()):
+    """Instances whose id is not in skip, keeping only the first row of a repeated id"""
+    seen = set(skip)
+    kept = []
+    for instance in instances:
+        if instance.pk not in seen:
+            seen.add(instance.pk)
+            kept.append(instance)
+    return kept
+
+
+def last_of_each_id(instances):
+    """Instances keeping only the last row of a repeated id"""
+    return list({instance.pk: instance for instance in instances}.values())
+
+
+def write_partitioned_employees(instances, use_copy, mode, previous):
+    """
+    Write employees to the partitioned table, which can only enforce a unique
+    (id, datetime). Duplicate ids are checked here instead: the insert mode
+    rejects them, ignore skips them and upsert deletes the stored rows before
+    inserting, which also moves a row whose year changed to its partition.
+    """
+    if mode == MODE_IGNORE:
+        instances = first_of_each_id(instances, previous)
+        use_copy = False
+    else:
+        counts = Counter(instance.pk for instance in instances)
+        duplicates = {pk for pk, count in counts.items() if count > 1}
+        if mode == MODE_INSERT:
+            duplicates |= set(previous)
+        if duplicates:
+            raise IntegrityError(f"duplicate key value: Key (id)=({min(duplicates)}) already exists.")
+        if mode == MODE_UPSERT:
+            HiredEmployee.objects.filter(id__in=list(previous)).delete()
+            use_copy = False
+
+    if use_copy:
+        copy_instances(HiredEmployee, instances)
+    else:
+        HiredEmployee.objects.bulk_create(instances)
+
+
+def write_instances(model, instances, use_copy, mode=MODE_INSERT):
+    """
+    Write one chunk of instances with COPY or bulk_create.
+
+    The ignore and upsert modes map to ON CONFLICT DO NOTHING / DO UPDATE on the
+    primary key. COPY has no conflict handling, so they always use bulk_create.
+    Written employees are counted into the HiringSummary rollup in the same
+    savepoint, so a rejected chunk never reaches it.
+
+    A repeated id is written and counted once: upsert keeps its last row, as
+    successive upserts would, and ignore its first. The insert mode keeps the
+    repeats so the database rejects them. Ignore leaves out the rows whose id
+    is already stored. Returns the written instances.
+    """
+    if mode == MODE_UPSERT:
+        instances = last_of_each_id(instances)
+
+    partitioned = model is HiredEmployee and is_partitioned()
+    previous = {}
+    if model is HiredEmployee and (mode != MODE_INSERT or partitioned):
+        # Conflicting rows are skipped or replaced, so their stored values are needed
+        previous = existing_hires([instance.pk for instance in instances])
+    elif mode == MODE_IGNORE:
+        previous = set(model.objects.filter(pk__in=[instance.pk for instance in instances]).values_list("pk", flat=True))
+
+    if mode == MODE_IGNORE:
+        instances = first_of_each_id(instances, previous)
+
+    if partitioned:
+        write_partitioned_employees(instances, use_copy, mode, previous)
+    elif mode == MODE_IGNORE:
+        model.objects.bulk_create(instances, ignore_conflicts=True)
+    elif mode == MODE_UPSERT:
+        model.objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=[model._meta.pk.name],
+            update_fields=[field.name for field in model._meta.concrete_fields if not field.primary_key],
+        )
+    elif use_copy:
+        copy_instances(model, instances)
+    else:
+        model.objects.bulk_create(instances)
+
+    if model is HiredEmployee:
+        if mode == MODE_IGNORE:
+            update_hiring_summary(hires_of(instances))
+        else:
+            update_hiring_summary(hires_of(instances), previous.values())
+
+    return instances
+
+
+def insert_chunk(model, instances, offset, use_copy, mode, inserted, rejected):
+    """
+    Insert a chunk under its own savepoint. When the chunk fails it is split in
+    halves until the offending rows are isolated; they are added to rejected
+    with their index in the payload and the database error.
+    """
+    try:
+        with transaction.atomic():
+            written = write_instances(model, instances, use_copy, mode)
+    except (IntegrityError, DataError) as e:
+        if len(instances) == 1:
+            rejected.append({
+                "index": offset,
+                "id": instances[0].pk,
+                "reason": str(e).strip(),
+            })
+            return
+
+        middle = len(instances) // 2
+        insert_chunk(model, instances[:middle], offset, use_copy, mode, inserted, rejected)
+        insert_chunk(model, instances[middle:], offset + middle, use_copy, mode, inserted, rejected)
+    else:
+        inserted.extend(written)
+
+
+def insert_instances(model, instances, method=INGEST_BULK_CREATE, chunk_size=None, mode=MODE_INSERT):
+    """
+    Insert model instances in chunks, with COPY on PostgreSQL when requested.
+
+    Falls back to bulk_create when COPY is not available (e.g. SQLite). Each chunk
+    runs under its own savepoint, so rows that violate a constraint are rejected
+    without losing the rest of the payload. With the ignore/upsert modes rows
+    whose id already exists are skipped/updated in the same statement. The
+    written rows are then stamped with the new data version of the table.
+    Returns the written instances and the rejected rows.
+    """
+    chunk_size = chunk_size or settings.BULK_INGEST_CHUNK_SIZE
+    use_copy = method == INGEST_COPY and copy_supported()
+
+    inserted = []
+    rejected = []
+    with transaction.atomic():
+        if model is HiredEmployee:
+            ensure_employee_partitions(instances)
+
+        for start in range(0, len(instances), chunk_size):
+            chunk = instances[start:start + chunk_size]
+            insert_chunk(model, chunk, start, use_copy, mode, inserted, rejected)
+
+        if inserted:
+            # Stamped right before the commit: the version stays locked until then
+            row_version = stamp_row_versions(model, [instance.pk for instance in inserted])
+            for instance in inserted:
+                instance.row_version = row_version
+
+    return inserted, rejected
@@ -0,0 +1,165 @@
+# dbchallenge/dbdata/jobs.py
+
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import IngestJob
+from .parsers import NDJSONParser, CSVParser, AvroParser, decode_content_encoding
+from .pipeline import CSV_FIELDNAMES, ingest_rows
+
+_executor = None
+
+# Message of the jobs whose process stopped before they finished
+ORPHANED_MESSAGE = "Interrupted: the process running the job stopped before it finished"
+
+
+def get_executor():
+    """Worker pool shared by the ingest jobs of this process"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.INGEST_JOB_WORKERS,
+            thread_name_prefix="ingest-job",
+        )
+    return _executor
+
+
+def ensure_job_dir():
+    """Ensure the directory for the ingest job payloads exists"""
+    if not os.path.exists(settings.INGEST_JOB_DIR):
+        os.makedirs(settings.INGEST_JOB_DIR)
+    return settings.INGEST_JOB_DIR
+
+
+def create_ingest_job(table, stream, options):
+    """Store the payload of a bulk request on disk and queue it as an ingest job"""
+    job = IngestJob(table=table, options=options)
+    job.payload_file = os.path.join(ensure_job_dir(), f"{job.id}.payload")
+
+    # Copy the request body without parsing it, so the request returns straight away
+    with open(job.payload_file, "wb") as f:
+        shutil.copyfileobj(stream, f)
+
+    job.save()
+    submit_ingest_job(job)
+    return job
+
+
+def submit_ingest_job(job):
+    """Run the job in the worker pool, or inline when INGEST_JOB_WORKERS is 0"""
+    if settings.INGEST_JOB_WORKERS == 0:
+        run_ingest_job(job.id)
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run_worker, job.id))
+
+
+def run_worker(job_id):
+    """Entry point of the worker threads, which own their database connection"""
+    try:
+        run_ingest_job(job_id)
+    finally:
+        connection.close()
+
+
+def read_payload(job, f):
+    """Rows of a stored payload: a JSON list, or a lazy iterator for NDJSON/CSV/Avro bodies"""
+    content_type = job.options.get("content_type", "application/json")
+    encoding = settings.DEFAULT_CHARSET
+
+    # The payload is stored as it was sent, compressed or not
+    f = decode_content_encoding(f, job.options.get("content_encoding"))
+
+    if content_type == AvroParser.media_type:
+        return AvroParser().iter_rows(f, job.table)
+    if content_type == NDJSONParser.media_type:
+        return NDJSONParser().iter_rows(f, encoding)
+    if content_type == CSVParser.media_type:
+        fieldnames = None if job.options.get("header") else CSV_FIELDNAMES[job.table]
+        return CSVParser().iter_rows(f, encoding, fieldnames)
+
+    rows = json.load(f)
+    if not isinstance(rows, list):
+        raise ValueError("The payload must be a list of rows")
+    IngestJob.objects.filter(pk=job.pk).update(rows_total=len(rows))
+    return rows
+
+
+def remove_payload(job):
+    """Delete the stored payload of a job that finished, or failed for good"""
+    if os.path.exists(job.payload_file):
+        os.remove(job.payload_file)
+
+
+def run_ingest_job(job_id):
+    """Apply the payload of an ingest job in chunks, recording the progress after each one"""
+    job = IngestJob.objects.get(pk=job_id)
+    IngestJob.objects.filter(pk=job.pk).update(status=IngestJob.STATUS_RUNNING, started_at=timezone.now())
+
+    context = {
+        "ingest_method": job.options.get("ingest_method", settings.BULK_INGEST_METHOD),
+        "mode": job.options.get("mode"),
+        "chunk_size": job.options.get("chunk_size"),
+    }
+    context = {key: value for key, value in context.items() if value}
+
+    def progress(read, inserted, rejected):
+        IngestJob.objects.filter(pk=job.pk).update(
+            rows_done=read,
+            rows_inserted=inserted,
+            rows_rejected=len(rejected),
+            errors=rejected[:settings.INGEST_JOB_MAX_ERRORS],
+        )
+
+    try:
+        with open(job.payload_file, "rb") as f:
+            rows = read_payload(job, f)
+            read, inserted, rejected = ingest_rows(job.table, rows, context, progress, source=f"ingest-job:{job.id}")
+    except Exception as e:
+        IngestJob.objects.filter(pk=job.pk).update(
+            status=IngestJob.STATUS_FAILED,
+            message=str(e),
+            finished_at=timezone.now(),
+        )
+        remove_payload(job)
+        return
+
+    IngestJob.objects.filter(pk=job.pk).update(
+        status=IngestJob.STATUS_DONE,
+        rows_total=read,
+        finished_at=timezone.now(),
+    )
+    remove_payload(job)
+
+
+def recover_ingest_jobs(resubmit=False):
+    """
+    Jobs run in threads of the process that accepted them, so they are lost
+    when it stops. Called at startup, before any process serves requests: the
+    jobs left pending or running are marked failed, or with resubmit run
+    again from the start of their stored payload. The payloads of the jobs
+    marked failed are removed. Returns the recovered jobs.
+    """
+    jobs = list(IngestJob.objects.filter(status__in=(IngestJob.STATUS_PENDING, IngestJob.STATUS_RUNNING)))
+    for job in jobs:
+        if resubmit and os.path.exists(job.payload_file):
+            IngestJob.objects.filter(pk=job.pk).update(
+                status=IngestJob.STATUS_PENDING,
+                rows_done=0,
+                rows_inserted=0,
+                rows_rejected=0,
+                errors=[],
+                started_at=None,
+            )
+            run_ingest_job(job.id)
+        else:
+            IngestJob.objects.filter(pk=job.pk).update(
+                status=IngestJob.STATUS_FAILED,
+                message=ORPHANED_MESSAGE,
+                finished_at=timezone.now(),
+            )
+            remove_payload(job)
+    return jobs
@@ -0,0 +1,27 @@
+# dbchallenge/dbdata/management/commands/delete_hires.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from dbdata.cache import bump_table_versions
+from dbdata.models import HiredEmployee
+from dbdata.partitions import delete_hires_by_year
+from dbdata.rollups import parse_year_ranges
+
+
+class Command(BaseCommand):
+    help = "Delete the employees hired in some years, truncating their partitions when the table is partitioned"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", required=True, help="Years to delete: 2019, 2019-2021 or 2019,2021")
+
+    def handle(self, *args, **options):
+        try:
+            year_ranges = parse_year_ranges(options["year"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with transaction.atomic():
+            deleted = delete_hires_by_year(year_ranges)
+            bump_table_versions(HiredEmployee)
+
+        self.stdout.write(f"{deleted} employees deleted")
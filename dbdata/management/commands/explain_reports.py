@@ -0,0 +1,140 @@
+# dbchallenge/dbdata/management/commands/explain_reports.py
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from dbdata.cache import next_table_version
+from dbdata.models import HiredEmployee
+from dbdata.partitions import ensure_partitions
+from dbdata.reports import quarter_columns
+from dbdata.rollups import datetime_filter, rebuild_hiring_summary, year_filter
+
+# Synthetic employees are spread over these years
+GENERATE_FIRST_YEAR = 2015
+GENERATE_YEARS = 10
+
+
+def extract_sql(lookup_type, column):
+    """extract(<lookup_type> from column) in the SQL of the database, with its params"""
+    tzname = timezone.get_current_timezone_name() if settings.USE_TZ else None
+    sql, params = connection.ops.datetime_extract_sql(lookup_type, column, (), tzname)
+    return sql, list(params)
+
+
+def employee_quarter_sql(condition, params):
+    """Quarter report computed from the employee table, as it was before the HiringSummary rollup"""
+    quarter, quarter_params = extract_sql("quarter", "h.datetime")
+    sql = f"""
+        SELECT d.department, j.job, {quarter} quarter, count(*) total
+        FROM dbdata_hiredemployee h
+        INNER JOIN dbdata_department d on h.department_id_id = d.id
+        INNER JOIN dbdata_job j ON h.job_id_id = j.id
+        WHERE {condition}
+        GROUP BY 1,2,3
+        ORDER BY 1,2
+    """
+    return sql, quarter_params + params
+
+
+def report_queries(year):
+    """(name, sql, params) of the plans to compare"""
+    year_ranges = [(year, year)]
+    ranges, range_params = datetime_filter(year_ranges, "h.datetime")
+    years, year_params = year_filter(year_ranges, "s.year")
+    extract_year, extract_params = extract_sql("year", "h.datetime")
+
+    return [
+        (
+            "employee table, extract(YEAR ...) = year",
+            *employee_quarter_sql(f"{extract_year} = %s", extract_params + [year]),
+        ),
+        (
+            "employee table, half-open datetime range",
+            *employee_quarter_sql(ranges, range_params),
+        ),
+        (
+            "HiringSummary rollup, served by the report",
+            f"""
+                SELECT d.department, j.job, {quarter_columns("s.quarter", "s.total")}
+                FROM dbdata_hiringsummary s
+                INNER JOIN dbdata_department d on s.department_id_id = d.id
+                INNER JOIN dbdata_job j ON s.job_id_id = j.id
+                WHERE {years}
+                GROUP BY 1,2
+                ORDER BY 1,2
+            """,
+            year_params,
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Print the query plans of the quarter report, from the employee table and from the rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=2021, help="Year of the report")
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries with EXPLAIN ANALYZE (PostgreSQL only)",
+        )
+        parser.add_argument(
+            "--generate",
+            type=int,
+            default=0,
+            help="First insert this many synthetic employees over the existing departments and jobs (PostgreSQL only)",
+        )
+
+    def handle(self, *args, **options):
+        postgresql = connection.vendor == "postgresql"
+        if (options["analyze"] or options["generate"]) and not postgresql:
+            raise CommandError("--analyze and --generate need PostgreSQL")
+
+        if options["generate"]:
+            self.generate(options["generate"])
+
+        prefix = connection.ops.explain_query_prefix(**({"analyze": True} if options["analyze"] else {}))
+        for name, sql, params in report_queries(options["year"]):
+            with connection.cursor() as cursor:
+                start = time.time()
+                cursor.execute(f"{prefix} {sql}", params)
+                plan = cursor.fetchall()
+                elapsed = time.time() - start
+
+            self.stdout.write(f"-- {name} ({elapsed * 1000:.1f} ms)")
+            for row in plan:
+                self.stdout.write(str(row[-1]))
+            self.stdout.write("")
+
+    def generate(self, rows):
+        """Insert synthetic employees with generate_series, then refresh the rollup and the statistics"""
+        sql = f"""
+            WITH d AS (SELECT array_agg(id ORDER BY id) ids FROM dbdata_department),
+                 j AS (SELECT array_agg(id ORDER BY id) ids FROM dbdata_job),
+                 base AS (SELECT coalesce(max(id), 0) id FROM dbdata_hiredemployee)
+            INSERT INTO dbdata_hiredemployee (id, name, datetime, department_id_id, job_id_id, row_version)
+            SELECT
+                base.id + g
+                , 'Employee ' || (base.id + g)
+                , %s::timestamptz + random() * interval '{GENERATE_YEARS * 365} days'
+                , d.ids[1 + g %% cardinality(d.ids)]
+                , j.ids[1 + g %% cardinality(j.ids)]
+                , %s
+            FROM generate_series(1, %s) g, d, j, base
+            WHERE cardinality(d.ids) > 0 AND cardinality(j.ids) > 0
+        """
+        start = time.time()
+        with transaction.atomic():
+            ensure_partitions(range(GENERATE_FIRST_YEAR, GENERATE_FIRST_YEAR + GENERATE_YEARS + 1))
+            row_version = next_table_version(HiredEmployee)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [f"{GENERATE_FIRST_YEAR}-01-01T00:00:00Z", row_version, rows])
+                inserted = cursor.rowcount
+            rebuild_hiring_summary()
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE dbdata_hiredemployee")
+
+        self.stdout.write(f"{inserted} employees generated in {time.time() - start:.1f}s")
@@ -0,0 +1,204 @@
+# dbchallenge/dbdata/management/commands/load_historic.py
+
+import csv
+import os
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from dbdata.ingest import INGEST_METHODS, INGEST_MODES, MODE_INSERT, insert_instances, to_int
+from dbdata.models import Department, Job, HiredEmployee, RejectedRecord
+from dbdata.pipeline import CSV_FIELDNAMES
+
+
+def parse_department(row, known_ids):
+    """Build a Department from a departments.csv row"""
+    department_id, department = row
+    if to_int(department_id) is None:
+        raise ValueError("invalid id")
+    if not department:
+        raise ValueError("missing department")
+    return Department(id=int(department_id), department=department)
+
+
+def parse_job(row, known_ids):
+    """Build a Job from a jobs.csv row"""
+    job_id, job = row
+    if to_int(job_id) is None:
+        raise ValueError("invalid id")
+    if not job:
+        raise ValueError("missing job")
+    return Job(id=int(job_id), job=job)
+
+
+def parse_hired_employee(row, known_ids):
+    """Build a HiredEmployee from a hired_employees.csv row"""
+    employee_id, name, hired_at, department_id, job_id = row
+    if to_int(employee_id) is None:
+        raise ValueError("invalid id")
+
+    datetime_val = None
+    if hired_at:
+        datetime_val = parse_datetime(hired_at)
+        if datetime_val is None:
+            raise ValueError(f"invalid datetime {hired_at!r}")
+
+    if not department_id:
+        raise ValueError("missing department_id")
+    if to_int(department_id) not in known_ids["department"]:
+        raise ValueError(f"department {department_id} does not exist")
+    if not job_id:
+        raise ValueError("missing job_id")
+    if to_int(job_id) not in known_ids["job"]:
+        raise ValueError(f"job {job_id} does not exist")
+
+    return HiredEmployee(
+        id=int(employee_id),
+        name=name or None,
+        datetime=datetime_val,
+        department_id_id=int(department_id),
+        job_id_id=int(job_id),
+    )
+
+
+# Tables in foreign key order: (table, csv file, model, number of columns, row parser)
+TABLES = (
+    ("department", "departments.csv", Department, 2, parse_department),
+    ("job", "jobs.csv", Job, 2, parse_job),
+    ("hired_employee", "hired_employees.csv", HiredEmployee, 5, parse_hired_employee),
+)
+
+
+class Command(BaseCommand):
+    help = "Load the historic CSV files straight into the database, in foreign key order"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data-dir",
+            default=os.path.join(settings.BASE_DIR, "historic_data"),
+            help="Directory with departments.csv, jobs.csv and hired_employees.csv",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.BULK_INGEST_CHUNK_SIZE,
+            help="Rows per insert batch",
+        )
+        parser.add_argument(
+            "--ingest",
+            choices=INGEST_METHODS,
+            default=settings.BULK_INGEST_METHOD,
+            help="Insert with bulk_create or COPY (PostgreSQL only)",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=INGEST_MODES,
+            default=MODE_INSERT,
+            help="What to do with rows whose id already exists",
+        )
+        parser.add_argument(
+            "--quarantine",
+            action="store_true",
+            help="Also store the rejected rows as RejectedRecords, to replay them later",
+        )
+        parser.add_argument(
+            "--rejects",
+            default=None,
+            help="CSV file for the rejected rows (default: rejected_rows.csv in the temporary directory)",
+        )
+
+    def handle(self, *args, **options):
+        data_dir = options["data_dir"]
+        # Not next to the CSV files, which are tracked in the repository
+        rejects_file = options["rejects"] or os.path.join(tempfile.gettempdir(), "rejected_rows.csv")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be greater than 0")
+
+        total_rejected = 0
+        with open(rejects_file, "w", newline="") as f:
+            rejects = csv.writer(f)
+            rejects.writerow(["table", "line", "reason", "row"])
+
+            for table, filename, model, columns, parse in TABLES:
+                path = os.path.join(data_dir, filename)
+                if not os.path.exists(path):
+                    raise CommandError(f"File not found: {path}")
+
+                total_rejected += self.load_table(table, path, model, columns, parse, rejects, options)
+
+        if total_rejected:
+            self.stdout.write(f"{total_rejected} rejected rows written to {rejects_file}")
+
+    def load_table(self, table, path, model, columns, parse, rejects, options):
+        """Stream one CSV file into its table in batches, returning the number of rejected rows"""
+        # Dimension tables are small, so the foreign key check is done against in-memory id sets
+        known_ids = {
+            "department": set(Department.objects.values_list("id", flat=True)),
+            "job": set(Job.objects.values_list("id", flat=True)),
+        }
+
+        start = time.time()
+        read = inserted = rejected = 0
+        quarantined = []
+
+        def reject(line, row, reason):
+            rejects.writerow([table, line, reason] + row)
+            if options["quarantine"]:
+                quarantined.append(RejectedRecord(
+                    table=table,
+                    source="load_historic",
+                    payload={name: value if value != "" else None for name, value in zip(CSV_FIELDNAMES[table], row)},
+                    reason=reason,
+                ))
+
+        def flush(batch, lines):
+            written, failed = insert_instances(
+                model,
+                batch,
+                method=options["ingest"],
+                chunk_size=options["batch_size"],
+                mode=options["mode"],
+            )
+            for error in failed:
+                line, row = lines[error["index"]]
+                reject(line, row, error["reason"])
+            RejectedRecord.objects.bulk_create(quarantined)
+            quarantined.clear()
+            return len(written), len(failed)
+
+        batch = []
+        lines = []
+        with open(path, newline="") as f:
+            for line, row in enumerate(csv.reader(f), start=1):
+                read += 1
+                try:
+                    if len(row) != columns:
+                        raise ValueError(f"expected {columns} columns, got {len(row)}")
+                    batch.append(parse(row, known_ids))
+                    lines.append((line, row))
+                except ValueError as e:
+                    reject(line, row, str(e))
+                    rejected += 1
+
+                if len(batch) >= options["batch_size"]:
+                    written, failed = flush(batch, lines)
+                    inserted += written
+                    rejected += failed
+                    batch = []
+                    lines = []
+
+        if batch:
+            written, failed = flush(batch, lines)
+            inserted += written
+            rejected += failed
+        RejectedRecord.objects.bulk_create(quarantined)
+
+        elapsed = time.time() - start
+        rate = read / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{table}: {read} rows read, {inserted} inserted, {rejected} rejected "
+            f"in {elapsed:.2f}s ({rate:.0f} rows/s)"
+        )
+
+        return rejected
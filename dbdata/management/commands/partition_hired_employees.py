@@ -0,0 +1,90 @@
+# dbchallenge/dbdata/management/commands/partition_hired_employees.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from dbdata.models import Department, Job, HiredEmployee
+from dbdata.partitions import DEFAULT_PARTITION, TABLE, create_partition_sql, is_partitioned, reset_partitioned
+from dbdata.rollups import hiring_period
+
+OLD_TABLE = f"{TABLE}_unpartitioned"
+
+
+def partition_statements(years):
+    """
+    DDL that turns dbdata_hiredemployee into a table partitioned by datetime
+    range, one partition per year plus a default partition for the employees
+    without datetime. A partitioned table can only have unique constraints that
+    include the partition key, so the primary key becomes unique (id, datetime)
+    and duplicate ids are checked by dbdata.ingest.
+    """
+    qn = connection.ops.quote_name
+    fields = HiredEmployee._meta.concrete_fields
+    columns = ", ".join(
+        f"{qn(field.column)} {field.db_type(connection)} {'NULL' if field.null else 'NOT NULL'}"
+        for field in fields
+    )
+    column_names = ", ".join(qn(field.column) for field in fields)
+
+    statements = [
+        f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(OLD_TABLE)}",
+        f"CREATE TABLE {qn(TABLE)} ({columns}) PARTITION BY RANGE ({qn('datetime')})",
+        f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT",
+    ]
+    statements += [create_partition_sql(year) for year in sorted(years)]
+    statements += [
+        f"INSERT INTO {qn(TABLE)} ({column_names}) SELECT {column_names} FROM {qn(OLD_TABLE)}",
+        # Dropping the old table also drops its indexes, whose names are reused below
+        f"DROP TABLE {qn(OLD_TABLE)}",
+        f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(TABLE + '_id_datetime_uniq')} UNIQUE ({qn('id')}, {qn('datetime')})",
+    ]
+
+    for index in HiredEmployee._meta.indexes:
+        index_columns = ", ".join(qn(HiredEmployee._meta.get_field(name).column) for name in index.fields)
+        statements.append(f"CREATE INDEX {qn(index.name)} ON {qn(TABLE)} ({index_columns})")
+
+    for field_name, model in (("department_id", Department), ("job_id", Job)):
+        column = HiredEmployee._meta.get_field(field_name).column
+        statements.append(
+            f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(f'{TABLE}_{column}_fk')} "
+            f"FOREIGN KEY ({qn(column)}) REFERENCES {qn(model._meta.db_table)} ({qn('id')}) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+
+    statements.append(f"ANALYZE {qn(TABLE)}")
+    return statements
+
+
+class Command(BaseCommand):
+    help = (
+        "Turn dbdata_hiredemployee into a table partitioned by datetime year (PostgreSQL only). "
+        "Run it once with the application stopped; the data is copied in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs PostgreSQL")
+        if is_partitioned():
+            raise CommandError(f"{TABLE} is already partitioned")
+
+        # The partitions of the existing years, computed like the rollup years
+        years = {
+            hiring_period(datetime_val)[0]
+            for datetime_val in HiredEmployee.objects.datetimes("datetime", "year")
+        }
+        statements = partition_statements(years)
+
+        if options["dry_run"]:
+            for statement in statements:
+                self.stdout.write(f"{statement};")
+            return
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+        reset_partitioned()
+        self.stdout.write(f"{TABLE} partitioned by year: {len(years)} yearly partitions and {DEFAULT_PARTITION}")
@@ -0,0 +1,17 @@
+# dbchallenge/dbdata/management/commands/rebuild_hiring_summary.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from dbdata.cache import bump_table_versions
+from dbdata.models import HiredEmployee
+from dbdata.rollups import rebuild_hiring_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute the hiring rollups (quarterly, daily and monthly) from the HiredEmployee table, e.g. after loading rows with raw SQL"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_hiring_summary()
+            bump_table_versions(HiredEmployee)
+        self.stdout.write(f"{rows} hiring summary rows written")
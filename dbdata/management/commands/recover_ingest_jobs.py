@@ -0,0 +1,23 @@
+# dbchallenge/dbdata/management/commands/recover_ingest_jobs.py
+
+from django.core.management.base import BaseCommand
+from dbdata.jobs import recover_ingest_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Fail the ingest jobs left pending or running by a stopped process, or run them again with --resubmit. "
+        "Run it at startup, before the application serves requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resubmit",
+            action="store_true",
+            help="Run the jobs again from the start of their payload instead of failing them. Rows a job had "
+                 "already written are rejected as duplicates in insert mode, skipped or updated in ignore/upsert",
+        )
+
+    def handle(self, *args, **options):
+        jobs = recover_ingest_jobs(options["resubmit"])
+        self.stdout.write(f"{len(jobs)} interrupted ingest jobs {'resubmitted' if options['resubmit'] else 'failed'}")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbdata', '0002_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RejectedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=50)),
+                ('source', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('reason', models.JSONField(null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_replayed_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table', 'id'], name='dbdata_reje_table_3c2874_idx')],
+            },
+        ),
+    ]
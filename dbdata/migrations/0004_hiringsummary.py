@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce, ExtractQuarter, ExtractYear
+
+
+def build_hiring_summary(apps, schema_editor):
+    """Count the employees that were loaded before the rollup existed"""
+    HiredEmployee = apps.get_model('dbdata', 'HiredEmployee')
+    HiringSummary = apps.get_model('dbdata', 'HiringSummary')
+
+    rows = (
+        HiredEmployee.objects.order_by()
+        .annotate(
+            year=Coalesce(ExtractYear('datetime'), Value(0)),
+            quarter=Coalesce(ExtractQuarter('datetime'), Value(0)),
+        )
+        .values_list('department_id', 'job_id', 'year', 'quarter')
+        .annotate(total=Count('id'))
+    )
+    HiringSummary.objects.bulk_create(
+        [
+            HiringSummary(department_id_id=department_id, job_id_id=job_id, year=year, quarter=quarter, total=total)
+            for department_id, job_id, year, quarter, total in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbdata', '0003_rejectedrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HiringSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('quarter', models.IntegerField()),
+                ('total', models.IntegerField(default=0)),
+                ('department_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.department')),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'quarter'], name='dbdata_hiri_year_566a43_idx')],
+                'constraints': [models.UniqueConstraint(fields=('department_id', 'job_id', 'year', 'quarter'), name='unique_hiring_summary_period')],
+            },
+        ),
+        migrations.RunPython(build_hiring_summary, migrations.RunPython.noop),
+    ]
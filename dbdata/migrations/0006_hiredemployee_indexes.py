@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbdata', '0005_tableversion'),
+    ]
+
+    operations = [
+        # Create the composite indexes before dropping the foreign key indexes they cover
+        migrations.AddIndex(
+            model_name='hiredemployee',
+            index=models.Index(fields=['datetime'], name='hiredemployee_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hiredemployee',
+            index=models.Index(fields=['department_id', 'datetime'], name='hiredemployee_dept_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hiredemployee',
+            index=models.Index(fields=['job_id', 'datetime'], name='hiredemployee_job_dt_idx'),
+        ),
+        migrations.AlterField(
+            model_name='hiredemployee',
+            name='department_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='dbdata.department'),
+        ),
+        migrations.AlterField(
+            model_name='hiredemployee',
+            name='job_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='dbdata.job'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def build_hiring_daily_monthly_summary(apps, schema_editor):
+    """Count the employees that were loaded before the rollups existed"""
+    HiredEmployee = apps.get_model('dbdata', 'HiredEmployee')
+    employees = HiredEmployee.objects.filter(datetime__isnull=False).order_by()
+
+    for model_name, field, period in (
+        ('HiringDailySummary', 'day', TruncDate('datetime')),
+        ('HiringMonthlySummary', 'month', TruncMonth('datetime', output_field=DateField())),
+    ):
+        model = apps.get_model('dbdata', model_name)
+        rows = (
+            employees.annotate(period=period)
+            .values_list('department_id', 'job_id', 'period')
+            .annotate(total=Count('id'))
+        )
+        model.objects.bulk_create(
+            [
+                model(department_id_id=department_id, job_id_id=job_id, total=total, **{field: period_val})
+                for department_id, job_id, period_val, total in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbdata', '0006_hiredemployee_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HiringDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('department_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.department')),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='dbdata_hiri_day_3ce140_idx')],
+                'constraints': [models.UniqueConstraint(fields=('department_id', 'job_id', 'day'), name='unique_hiring_daily_summary')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HiringMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('department_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.department')),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dbdata.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='dbdata_hiri_month_4427ee_idx')],
+                'constraints': [models.UniqueConstraint(fields=('department_id', 'job_id', 'month'), name='unique_hiring_monthly_summary')],
+            },
+        ),
+        migrations.RunPython(build_hiring_daily_monthly_summary, migrations.RunPython.noop),
+    ]
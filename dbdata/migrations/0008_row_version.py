@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbdata', '0007_hiring_daily_monthly_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='row_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hiredemployee',
+            name='row_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='row_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='hiredemployee',
+            index=models.Index(fields=['row_version'], name='hiredemployee_row_version_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -11,6 +13,8 @@ class CustomUser(AbstractUser):
 class Department(models.Model):
     id = models.IntegerField(primary_key=True)
     department = models.CharField(max_length=255)
+    # Data version of the table (TableVersion) when the row was last written
+    row_version = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.department}"
@@ -19,6 +23,8 @@ class Department(models.Model):
 class Job(models.Model):
     id = models.IntegerField(primary_key=True)
     job = models.CharField(max_length=255)
+    # Data version of the table (TableVersion) when the row was last written
+    row_version = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.job}"
@@ -28,8 +34,146 @@ class HiredEmployee(models.Model):
     id = models.IntegerField(primary_key=True)
     name = models.CharField(max_length=255, null=True)
     datetime = models.DateTimeField(null=True)
-    department_id = models.ForeignKey(Department, on_delete=models.CASCADE, null=False)
-    job_id = models.ForeignKey(Job, on_delete=models.CASCADE, null=False)
+    # Covered by the composite indexes below, which lead with the foreign keys
+    department_id = models.ForeignKey(Department, on_delete=models.CASCADE, null=False, db_index=False)
+    job_id = models.ForeignKey(Job, on_delete=models.CASCADE, null=False, db_index=False)
+    # Data version of the table (TableVersion) when the row was last written
+    row_version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["datetime"], name="hiredemployee_datetime_idx"),
+            models.Index(fields=["department_id", "datetime"], name="hiredemployee_dept_dt_idx"),
+            models.Index(fields=["job_id", "datetime"], name="hiredemployee_job_dt_idx"),
+            # Incremental backups read the rows written since their base
+            models.Index(fields=["row_version"], name="hiredemployee_row_version_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name}"
+
+
+class HiringSummary(models.Model):
+    """Number of employees hired by department, job, year and quarter, kept up to date by dbdata.rollups"""
+    department_id = models.ForeignKey(Department, on_delete=models.CASCADE)
+    job_id = models.ForeignKey(Job, on_delete=models.CASCADE)
+    year = models.IntegerField()
+    quarter = models.IntegerField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["department_id", "job_id", "year", "quarter"],
+                name="unique_hiring_summary_period",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["year", "quarter"]),
+        ]
+
+    def __str__(self):
+        return f"{self.department_id} {self.job_id} {self.year}Q{self.quarter}: {self.total}"
+
+
+class HiringDailySummary(models.Model):
+    """Number of employees hired by department, job and day, kept up to date by dbdata.rollups"""
+    department_id = models.ForeignKey(Department, on_delete=models.CASCADE)
+    job_id = models.ForeignKey(Job, on_delete=models.CASCADE)
+    day = models.DateField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["department_id", "job_id", "day"], name="unique_hiring_daily_summary"),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.department_id} {self.job_id} {self.day}: {self.total}"
+
+
+class HiringMonthlySummary(models.Model):
+    """Number of employees hired by department, job and month (its first day), kept up to date by dbdata.rollups"""
+    department_id = models.ForeignKey(Department, on_delete=models.CASCADE)
+    job_id = models.ForeignKey(Job, on_delete=models.CASCADE)
+    month = models.DateField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["department_id", "job_id", "month"], name="unique_hiring_monthly_summary"),
+        ]
+        indexes = [
+            models.Index(fields=["month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.department_id} {self.job_id} {self.month:%Y-%m}: {self.total}"
+
+
+class TableVersion(models.Model):
+    """Data version of a table, bumped by every write so cached responses can be told apart"""
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class IngestJob(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    table = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    payload_file = models.CharField(max_length=500)
+    options = models.JSONField(default=dict)
+    rows_total = models.IntegerField(null=True)
+    rows_done = models.IntegerField(default=0)
+    rows_inserted = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    message = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.table} {self.id} ({self.status})"
+
+    @property
+    def rows_per_second(self):
+        if not self.started_at:
+            return None
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.rows_done / elapsed) if elapsed else None
+
+
+class RejectedRecord(models.Model):
+    table = models.CharField(max_length=50)
+    source = models.CharField(max_length=255)
+    payload = models.JSONField()
+    reason = models.JSONField(null=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_replayed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["table", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.table} {self.payload}"
@@ -0,0 +1,174 @@
+# dbchallenge/dbdata/parsers.py
+
+import codecs
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import zlib
+from avro.datafile import DataFileReader
+from avro.io import DatumReader
+from django.conf import settings
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser, JSONParser
+from .backup import SCHEMAS
+
+# Raised while decompressing a body that is not valid gzip
+DECODE_ERRORS = (OSError, EOFError, zlib.error)
+
+
+class InvalidRow:
+    """Placeholder yielded for a line of a streamed body that could not be parsed"""
+
+    def __init__(self, reason, raw=None):
+        self.reason = reason
+        self.raw = raw
+
+
+def iter_lines(stream, encoding):
+    """Decode a byte stream line by line, without reading it whole"""
+    return codecs.iterdecode(iter(stream.readline, b""), encoding)
+
+
+def decode_content_encoding(stream, content_encoding):
+    """Wrap a request stream so a gzip encoded body is decompressed while it is read"""
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if content_encoding == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if content_encoding != "identity":
+        raise UnsupportedMediaType(content_encoding, detail=f"Unsupported Content-Encoding: {content_encoding}")
+    return stream
+
+
+def spool(stream):
+    """Copy a stream to a temporary file that only stays in memory while it is small"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=settings.AVRO_SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(stream, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+class ContentEncodingMixin:
+    """
+    Lets a parser read bodies sent with Content-Encoding: gzip. The body is
+    decompressed to a spooled file before any row is parsed, so a corrupt
+    body is answered with a 400 instead of failing after rows were inserted.
+    """
+
+    def decode_stream(self, stream, parser_context):
+        request = (parser_context or {}).get('request')
+        if request is None:
+            return stream
+        decoded = decode_content_encoding(stream, request.META.get('HTTP_CONTENT_ENCODING'))
+        if decoded is stream:
+            return stream
+        try:
+            return spool(decoded)
+        except DECODE_ERRORS as exc:
+            raise ParseError(f'Content-Encoding error - {exc}')
+
+
+class GzipJSONParser(ContentEncodingMixin, JSONParser):
+    """JSONParser that also accepts gzip encoded bodies"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        stream = self.decode_stream(stream, parser_context)
+        return super().parse(stream, media_type, parser_context)
+
+
+class NDJSONParser(ContentEncodingMixin, BaseParser):
+    """
+    Parses newline delimited JSON lazily: returns a generator of rows that reads
+    the request stream as it is consumed, so the body is never held in memory.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.iter_rows(self.decode_stream(stream, parser_context), encoding)
+
+    def iter_rows(self, stream, encoding):
+        for line in iter_lines(stream, encoding):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield InvalidRow(f'JSON parse error - {exc}', line)
+                continue
+            if not isinstance(row, dict):
+                yield InvalidRow('Expected a JSON object', line)
+                continue
+            yield row
+
+
+class CSVParser(ContentEncodingMixin, BaseParser):
+    """
+    Parses CSV lazily, like NDJSONParser. The column names are taken from the
+    `csv_fieldnames` of the view, or from the first line with ?header=true.
+    Empty fields are read as null.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        fieldnames = getattr(parser_context.get('view'), 'csv_fieldnames', None)
+
+        request = parser_context.get('request')
+        if request is not None and request.query_params.get('header') in ('1', 'true'):
+            fieldnames = None
+
+        return self.iter_rows(self.decode_stream(stream, parser_context), encoding, fieldnames)
+
+    def iter_rows(self, stream, encoding, fieldnames):
+        reader = csv.reader(iter_lines(stream, encoding))
+        if fieldnames is None:
+            fieldnames = next(reader, [])
+
+        for values in reader:
+            if not values:
+                continue
+            if len(values) != len(fieldnames):
+                yield InvalidRow(f'Expected {len(fieldnames)} columns, got {len(values)}', values)
+                continue
+            yield {name: value if value != '' else None for name, value in zip(fieldnames, values)}
+
+
+class AvroParser(ContentEncodingMixin, BaseParser):
+    """
+    Parses an Avro object container file, such as the files written by
+    dbdata.backup, and returns a generator of its records. The writer schema
+    must be the schema of the table of the view.
+
+    The Avro reader needs a seekable file, so the body is spooled to a
+    temporary file that only stays in memory while it is small.
+    """
+    media_type = 'avro/binary'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        table = getattr(parser_context.get('view'), 'table', None)
+        return self.iter_rows(self.decode_stream(stream, parser_context), table)
+
+    def iter_rows(self, stream, table=None):
+        if not isinstance(stream, (io.BytesIO, io.BufferedReader, tempfile.SpooledTemporaryFile)):
+            stream = spool(stream)
+
+        try:
+            reader = DataFileReader(stream, DatumReader())
+        except Exception as exc:
+            raise ParseError(f'Avro parse error - {exc}')
+
+        if table is not None:
+            writer_schema = json.loads(reader.GetMeta('avro.schema'))
+            if writer_schema.get('name') != SCHEMAS[table]['name']:
+                reader.close()
+                raise ParseError(f"Avro schema {writer_schema.get('name')} does not match table {table}")
+
+        with reader:
+            yield from reader
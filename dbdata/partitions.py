@@ -0,0 +1,120 @@
+# dbchallenge/dbdata/partitions.py
+
+from django.db import connection
+from .models import HiredEmployee, HiringSummary
+from .rollups import delete_rollup_rows, hired_in, hiring_period, year_start, years_of
+
+TABLE = HiredEmployee._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Whether the employee table is partitioned, by database alias. It only changes
+# when partition_hired_employees runs, so it is looked up once per process.
+_partitioned = {}
+
+
+def partition_name(year):
+    """Name of the partition that holds the employees hired in a year"""
+    return f"{TABLE}_y{year}"
+
+
+def is_partitioned():
+    """Whether dbdata_hiredemployee has been turned into a partitioned table (PostgreSQL only)"""
+    if connection.vendor != "postgresql":
+        return False
+
+    if connection.alias not in _partitioned:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+            row = cursor.fetchone()
+        _partitioned[connection.alias] = bool(row) and row[0] == "p"
+
+    return _partitioned[connection.alias]
+
+
+def reset_partitioned():
+    """Forget the cached answer of is_partitioned, after the table was converted"""
+    _partitioned.clear()
+
+
+def partition_years():
+    """Years that have a partition"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            INNER JOIN pg_class c ON i.inhrelid = c.oid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = partition_name("")
+    return {int(name[len(prefix):]) for name in names if name.startswith(prefix)}
+
+
+def create_partition_sql(year):
+    """DDL of the partition of a year: [Jan 1, next Jan 1) in the current time zone"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(year))} "
+        f"PARTITION OF {connection.ops.quote_name(TABLE)} "
+        f"FOR VALUES FROM ('{year_start(year).isoformat()}') TO ('{year_start(year + 1).isoformat()}')"
+    )
+
+
+def ensure_partitions(years):
+    """
+    Create the missing partitions of the given years before rows are written
+    to them, so they never land in the default partition. Checked against the
+    catalog on every call, as a rolled back transaction also drops partitions.
+    """
+    if not is_partitioned():
+        return
+
+    missing = set(years) - partition_years()
+    with connection.cursor() as cursor:
+        for year in sorted(missing):
+            cursor.execute(create_partition_sql(year))
+
+
+def ensure_employee_partitions(instances):
+    """Create the partitions needed by HiredEmployee instances"""
+    if is_partitioned():
+        ensure_partitions({hiring_period(instance.datetime)[0] for instance in instances if instance.datetime})
+
+
+def truncate_hired_employees():
+    """Delete every employee: TRUNCATE on a partitioned table, a plain delete otherwise"""
+    if is_partitioned():
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {connection.ops.quote_name(TABLE)}")
+    else:
+        HiredEmployee.objects.all().delete()
+    delete_rollup_rows()
+
+
+def delete_hires_by_year(year_ranges):
+    """
+    Delete the employees hired in the (first, last) year ranges.
+
+    On a partitioned table the partitions of those years are truncated and the
+    rest of the table is never read; otherwise the rows are deleted with
+    index-friendly half-open datetime ranges. The rollup years map one to one
+    to the deleted rows, so the rollup rows of those years are dropped too.
+    Returns the number of deleted employees.
+    """
+    years = years_of(year_ranges)
+    deleted = sum(HiringSummary.objects.filter(year__in=years).values_list("total", flat=True))
+
+    if is_partitioned():
+        partitions = sorted(years & partition_years())
+        if partitions:
+            names = ", ".join(connection.ops.quote_name(partition_name(year)) for year in partitions)
+            with connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {names}")
+    else:
+        HiredEmployee.objects.filter(hired_in(year_ranges)).delete()
+
+    delete_rollup_rows(year_ranges)
+    return deleted
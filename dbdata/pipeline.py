@@ -0,0 +1,175 @@
+# dbchallenge/dbdata/pipeline.py
+
+from itertools import islice
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from .ingest import resolve_hired_employee_foreign_keys
+from .models import RejectedRecord
+from .parsers import InvalidRow
+from .serializers import BulkDepartmentSerializer, BulkJobSerializer, BulkHiredEmployeeSerializer
+
+# Bulk serializer of each table, in foreign key order
+BULK_SERIALIZERS = {
+    "department": BulkDepartmentSerializer,
+    "job": BulkJobSerializer,
+    "hired_employee": BulkHiredEmployeeSerializer,
+}
+
+# Column order of the headerless CSV files of each table
+CSV_FIELDNAMES = {
+    "department": ["id", "department"],
+    "job": ["id", "job"],
+    "hired_employee": ["id", "name", "datetime", "department_id", "job_id"],
+}
+
+
+def to_payload(row):
+    """JSON value of a payload row, whose foreign keys may have been resolved to instances"""
+    if isinstance(row, InvalidRow):
+        return {"raw": row.raw}
+    return {key: value.pk if isinstance(value, models.Model) else value for key, value in row.items()}
+
+
+def quarantine_rows(table, source, rows, rejected, offset=0):
+    """Store the rejected rows of a payload in the RejectedRecord table, with one insert"""
+    return RejectedRecord.objects.bulk_create([
+        RejectedRecord(
+            table=table,
+            source=source,
+            payload=to_payload(rows[error["index"] - offset]),
+            reason=error["reason"],
+        )
+        for error in rejected
+    ])
+
+
+def ingest_batch(table, rows, offset=0, context=None, source=None):
+    """
+    Validate and insert one batch of payload rows of a table.
+
+    Unlike the bulk endpoints, invalid rows do not reject the batch: they are
+    returned with their reason and the valid rows are inserted. When a source
+    is given the rejected rows are also quarantined as RejectedRecords.
+    Returns the number of inserted rows and the rejected rows, indexed from
+    offset.
+    """
+    serializer_class = BULK_SERIALIZERS[table]
+    context = context or {}
+    rejected = []
+
+    # Lines of a streamed body that could not be parsed
+    candidates = []
+    for index, row in enumerate(rows):
+        if isinstance(row, InvalidRow):
+            rejected.append({"index": index, "reason": row.reason})
+        else:
+            candidates.append((index, row))
+
+    if table == "hired_employee":
+        for error in resolve_hired_employee_foreign_keys([row for _, row in candidates]):
+            position = error.pop("index")
+            rejected.append({"index": candidates[position][0], "reason": error})
+
+    failed = {row["index"] for row in rejected}
+    candidates = [(index, row) for index, row in candidates if index not in failed]
+
+    serializer = serializer_class(data=[row for _, row in candidates], many=True, context=context)
+    if not serializer.is_valid():
+        # Keep the rows without errors and validate them again
+        valid = []
+        for (index, row), errors in zip(candidates, serializer.errors):
+            if errors:
+                rejected.append({"index": index, "reason": errors})
+            else:
+                valid.append((index, row))
+        candidates = valid
+        serializer = serializer_class(data=[row for _, row in candidates], many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+
+    inserted = serializer.save() if candidates else []
+    for error in serializer.rejected if candidates else ():
+        rejected.append(dict(error, index=candidates[error["index"]][0]))
+
+    rejected.sort(key=lambda error: error["index"])
+    if source and rejected:
+        quarantine_rows(table, source, rows, rejected)
+
+    for error in rejected:
+        error["index"] += offset
+
+    return len(inserted), rejected
+
+
+def iter_batches(rows, size):
+    """Split an iterable of rows into lists of at most size rows"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest_rows(table, rows, context=None, progress=None, source=None):
+    """
+    Validate and insert an iterable of rows in bounded batches, so a streamed
+    payload is never held in memory. `progress` is called after each batch with
+    the running totals. Returns the number of rows read, inserted and the
+    rejected rows, which are quarantined when a source is given.
+    """
+    context = context or {}
+    chunk_size = context.get("chunk_size") or settings.BULK_INGEST_CHUNK_SIZE
+
+    read = inserted = 0
+    rejected = []
+    for batch in iter_batches(rows, chunk_size):
+        batch_inserted, batch_rejected = ingest_batch(table, batch, offset=read, context=context, source=source)
+        read += len(batch)
+        inserted += batch_inserted
+        rejected.extend(batch_rejected)
+        if progress:
+            progress(read, inserted, rejected)
+
+    return read, inserted, rejected
+
+
+def replay_rejected_records(table, ids=None, context=None):
+    """
+    Replay quarantined rows of a table in batches, e.g. once the missing
+    departments or jobs exist. Rows that are inserted leave the quarantine;
+    the others keep it with their new reason. Returns the number of records
+    replayed, inserted and still rejected.
+    """
+    context = context or {}
+    chunk_size = context.get("chunk_size") or settings.BULK_INGEST_CHUNK_SIZE
+
+    queryset = RejectedRecord.objects.filter(table=table).order_by("id")
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    replayed = inserted = still_rejected = 0
+    last_id = 0
+    while True:
+        records = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not records:
+            break
+        last_id = records[-1].id
+
+        batch_inserted, rejected = ingest_batch(table, [dict(record.payload) for record in records], context=context)
+        failed = {}
+        for error in rejected:
+            record = records[error["index"]]
+            record.reason = error["reason"]
+            record.attempts += 1
+            record.last_replayed_at = timezone.now()
+            failed[record.id] = record
+
+        RejectedRecord.objects.filter(id__in=[record.id for record in records if record.id not in failed]).delete()
+        RejectedRecord.objects.bulk_update(failed.values(), ["reason", "attempts", "last_replayed_at"])
+
+        replayed += len(records)
+        inserted += batch_inserted
+        still_rejected += len(failed)
+
+    return replayed, inserted, still_rejected
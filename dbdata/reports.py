@@ -0,0 +1,67 @@
+# dbchallenge/dbdata/reports.py
+
+import json
+from django.db import connection
+from .formats import FORMATS, iter_chunks, to_text
+
+# Rows fetched from the cursor, and encoded, per chunk of the response
+REPORT_FETCH_SIZE = 2000
+
+QUARTERS = (1, 2, 3, 4)
+
+
+def quarter_columns(column, total):
+    """
+    SQL select list that pivots the quarters into one column each.
+
+    Uses the aggregate FILTER clause where the database has it (PostgreSQL,
+    SQLite 3.30+) and the equivalent SUM(CASE ...) elsewhere.
+    """
+    if connection.features.supports_aggregate_filter_clause:
+        template = "coalesce(sum({total}) FILTER (WHERE {column} = {quarter}), 0) q{quarter}"
+    else:
+        template = "sum(CASE WHEN {column} = {quarter} THEN {total} ELSE 0 END) q{quarter}"
+    return "\n                , ".join(
+        template.format(column=column, total=total, quarter=quarter) for quarter in QUARTERS
+    )
+
+
+def iter_report_rows(sql, params):
+    """Run a report query and yield its rows, fetched from the cursor in chunks"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(REPORT_FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+
+def iter_report_json(columns, rows, types=None):
+    """
+    Encode report rows as a compact JSON object keyed by row number, as
+    {"0": {column: value, ...}, ...}. Rows are encoded and yielded in chunks,
+    so the result set is never held in memory.
+    """
+    encoder = json.JSONEncoder(separators=(",", ":"), default=to_text)
+    keys = [encoder.encode(str(column)) + ":" for column in columns]
+
+    yield "{"
+    index = 0
+    for chunk in iter_chunks(rows, REPORT_FETCH_SIZE):
+        encoded = []
+        for row in chunk:
+            fields = ",".join(key + encoder.encode(value) for key, value in zip(keys, row))
+            encoded.append(f'{"," if index else ""}"{index}":{{{fields}}}')
+            index += 1
+        yield "".join(encoded)
+    yield "}"
+
+
+# Output formats of the reports: the JSON above by default, or one of the streamed formats
+REPORT_FORMATS = {
+    "json": (iter_report_json, "application/json"),
+    "csv": FORMATS["csv"],
+    "arrow": FORMATS["arrow"],
+    "parquet": FORMATS["parquet"],
+}
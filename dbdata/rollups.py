@@ -0,0 +1,232 @@
+# dbchallenge/dbdata/rollups.py
+
+from collections import Counter
+from datetime import date, datetime
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, DateField, Q, Value
+from django.db.models.functions import Coalesce, ExtractQuarter, ExtractYear, TruncDate, TruncMonth
+from django.utils import timezone
+from .models import HiredEmployee, HiringDailySummary, HiringMonthlySummary, HiringSummary
+
+# Year and quarter of the employees hired without a datetime. Every hire is
+# counted, so the all-time totals of the reports can be read from the rollup.
+UNKNOWN_PERIOD = 0
+
+
+def hiring_period(datetime_val):
+    """Year and quarter of a hire, in the current time zone like the database extracts"""
+    if datetime_val is None:
+        return UNKNOWN_PERIOD, UNKNOWN_PERIOD
+    if timezone.is_aware(datetime_val):
+        datetime_val = timezone.localtime(datetime_val)
+    return datetime_val.year, (datetime_val.month - 1) // 3 + 1
+
+
+def hiring_day(datetime_val):
+    """Day of a hire in the current time zone, None without datetime"""
+    if datetime_val is None:
+        return None
+    if timezone.is_aware(datetime_val):
+        datetime_val = timezone.localtime(datetime_val)
+    return datetime_val.date()
+
+
+def hiring_month(datetime_val):
+    """First day of the month of a hire in the current time zone, None without datetime"""
+    day = hiring_day(datetime_val)
+    return None if day is None else day.replace(day=1)
+
+
+# Rollups of the employee table, by model: the columns of the period, the
+# period of a datetime computed in Python and the same period computed by the
+# database. The quarter rollup counts every hire; the daily and monthly ones
+# skip the hires without datetime.
+ROLLUPS = {
+    HiringSummary: (
+        ("year", "quarter"),
+        hiring_period,
+        lambda: {
+            "year": Coalesce(ExtractYear("datetime"), Value(UNKNOWN_PERIOD)),
+            "quarter": Coalesce(ExtractQuarter("datetime"), Value(UNKNOWN_PERIOD)),
+        },
+    ),
+    HiringDailySummary: (
+        ("day",),
+        lambda datetime_val: (hiring_day(datetime_val),),
+        lambda: {"day": TruncDate("datetime")},
+    ),
+    HiringMonthlySummary: (
+        ("month",),
+        lambda datetime_val: (hiring_month(datetime_val),),
+        lambda: {"month": TruncMonth("datetime", output_field=DateField())},
+    ),
+}
+
+
+def hires_of(instances):
+    """(department id, job id, datetime) of HiredEmployee instances"""
+    return [(instance.department_id_id, instance.job_id_id, instance.datetime) for instance in instances]
+
+
+def existing_hires(ids):
+    """(department id, job id, datetime) of the stored employees with the given ids, by id"""
+    queryset = HiredEmployee.objects.filter(id__in=ids).values_list("id", "department_id", "job_id", "datetime")
+    return {row[0]: row[1:] for row in queryset}
+
+
+def summarize(queryset, model=HiringSummary):
+    """Hires of a HiredEmployee queryset by department, job and period of a rollup, counted by the database"""
+    columns, _, expressions = ROLLUPS[model]
+    rows = (
+        queryset.order_by()
+        .annotate(**expressions())
+        .values_list("department_id", "job_id", *columns)
+        .annotate(total=Count("id"))
+    )
+    return Counter({row[:-1]: row[-1] for row in rows if None not in row})
+
+
+def apply_hiring_deltas(deltas, model=HiringSummary):
+    """
+    Add signed counts to the rows of a rollup, creating the missing ones.
+
+    Each key is updated in place with INSERT ... ON CONFLICT DO UPDATE, which
+    PostgreSQL and SQLite both support, so concurrent loads never read and
+    rewrite the same row. Keys are applied in order to avoid deadlocks.
+    """
+    deltas = sorted((key, total) for key, total in deltas.items() if total)
+    if not deltas:
+        return
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    key_columns = ("department_id_id", "job_id_id") + ROLLUPS[model][0]
+    sql = f"""
+        INSERT INTO {table} ({", ".join(key_columns)}, total)
+        VALUES ({", ".join(["%s"] * (len(key_columns) + 1))})
+        ON CONFLICT ({", ".join(key_columns)})
+        DO UPDATE SET total = {table}.total + excluded.total
+    """
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [key + (total,) for key, total in deltas])
+
+    if any(total < 0 for _, total in deltas):
+        model.objects.filter(total__lte=0).delete()
+
+
+def update_hiring_summary(added=(), removed=()):
+    """Count added and removed hires, given as (department id, job id, datetime), into the rollups"""
+    for model, (_, period, _) in ROLLUPS.items():
+        deltas = Counter()
+        for department_id, job_id, datetime_val in added:
+            deltas[(department_id, job_id) + period(datetime_val)] += 1
+        for department_id, job_id, datetime_val in removed:
+            deltas[(department_id, job_id) + period(datetime_val)] -= 1
+        apply_hiring_deltas(Counter({key: total for key, total in deltas.items() if None not in key}), model)
+
+
+def remove_from_hiring_summary(queryset):
+    """Subtract the employees of a queryset that is about to be deleted"""
+    for model in ROLLUPS:
+        deltas = summarize(queryset, model)
+        apply_hiring_deltas(Counter({key: -total for key, total in deltas.items()}), model)
+
+
+def rollup_rows(model, year_ranges=None):
+    """Rows of a rollup, only those of the (first, last) year ranges when given"""
+    rows = model.objects.all()
+    if year_ranges:
+        if model is HiringSummary:
+            rows = rows.filter(year__in=years_of(year_ranges))
+        else:
+            column = ROLLUPS[model][0][0]
+            query = Q()
+            for first, last in year_ranges:
+                query |= Q(**{f"{column}__gte": date(first, 1, 1), f"{column}__lt": date(last + 1, 1, 1)})
+            rows = rows.filter(query)
+    return rows
+
+
+def delete_rollup_rows(year_ranges=None):
+    """Delete the rows of every rollup, only those of the (first, last) year ranges when given"""
+    for model in ROLLUPS:
+        rollup_rows(model, year_ranges).delete()
+
+
+def rebuild_hiring_summary(year_ranges=None):
+    """
+    Recompute the rollups from the HiredEmployee table, e.g. after a restore.
+    With year ranges only those years are recomputed, reading only their rows.
+    Returns the number of rows of the quarter rollup.
+    """
+    employees = HiredEmployee.objects.all()
+    if year_ranges:
+        employees = employees.filter(hired_in(year_ranges))
+
+    delete_rollup_rows(year_ranges)
+    for model, (columns, _, _) in ROLLUPS.items():
+        model.objects.bulk_create(
+            [
+                model(department_id_id=key[0], job_id_id=key[1], total=total, **dict(zip(columns, key[2:])))
+                for key, total in summarize(employees, model).items()
+            ],
+            batch_size=1000,
+        )
+    return HiringSummary.objects.count()
+
+
+def parse_year_ranges(value):
+    """Parse "2021", "2019-2021" or "2019,2021" into a list of (first, last) year ranges"""
+    year_ranges = []
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            first, last = int(first), int(last or first)
+        except ValueError:
+            first = last = None
+        if first is None or not 0 < first <= last < 9999:
+            raise ValueError(f"Invalid year or year range: {part.strip()!r}")
+        year_ranges.append((first, last))
+    return year_ranges
+
+
+def format_year_ranges(year_ranges):
+    """Inverse of parse_year_ranges"""
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in year_ranges)
+
+
+def years_of(year_ranges):
+    """Every year of the (first, last) year ranges"""
+    return {year for first, last in year_ranges for year in range(first, last + 1)}
+
+
+def year_filter(year_ranges, column):
+    """SQL condition and params that keep the rows whose year is in one of the (first, last) ranges"""
+    condition = " OR ".join(f"{column} BETWEEN %s AND %s" for _ in year_ranges)
+    params = [year for year_range in year_ranges for year in year_range]
+    return f"({condition})", params
+
+
+def year_start(year):
+    """First instant of a year in the current time zone"""
+    start = datetime(year, 1, 1)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def datetime_filter(year_ranges, column):
+    """
+    SQL condition and params that keep the rows whose datetime falls in one of
+    the (first, last) year ranges. Uses half-open [first, last + 1) predicates
+    that an index on the column can serve, unlike extract(YEAR from column).
+    """
+    condition = " OR ".join(f"({column} >= %s AND {column} < %s)" for _ in year_ranges)
+    params = [bound for first, last in year_ranges for bound in (year_start(first), year_start(last + 1))]
+    return f"({condition})", params
+
+
+def hired_in(year_ranges):
+    """Q of the employees hired in the (first, last) year ranges, as half-open datetime ranges"""
+    query = Q()
+    for first, last in year_ranges:
+        query |= Q(datetime__gte=year_start(first), datetime__lt=year_start(last + 1))
+    return query
@@ -1,17 +1,27 @@
 
-import time
 from rest_framework import serializers
-from .models import Department, Job, HiredEmployee
+from .models import Department, Job, HiredEmployee, IngestJob, RejectedRecord
 from .fields import ModelObjectIdField
-from django.db import IntegrityError
+from .cache import stamp_row_versions
+from .ingest import MODE_INSERT, insert_instances
+from .partitions import ensure_employee_partitions
+from .rollups import existing_hires, hires_of, update_hiring_summary
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework.exceptions import ValidationError
 
 
 class DepartmentSerializer(serializers.ModelSerializer):
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            instance.row_version = stamp_row_versions(Department, [instance.pk])
+        return instance
+
     class Meta:
         model = Department
-        fields = '__all__'
+        fields = ('id', 'department')
         read_only_fields = ()
 
 
@@ -19,7 +29,7 @@ class JobSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Job
-        fields = '__all__'
+        fields = ('id', 'job')
         read_only_fields = ()
 
 
@@ -30,20 +40,33 @@ class HiredEmployeeSerializer(serializers.Serializer):
     #total = serializers.IntegerField()
 
 
-class DepartmentBulkCreateListSerializer(serializers.ListSerializer):
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Builds one unsaved instance per row and inserts them in chunks, with
+    bulk_create or COPY depending on the "ingest_method" context option.
+    Rows rejected by the database are kept in `rejected` and left out of
+    the result.
+    """
+
+    rejected = ()
+
     def create(self, validated_data):
 
         result = [self.child.create(attrs) for attrs in validated_data]
 
-        try:
-            self.child.Meta.model.objects.bulk_create(result)
-        except IntegrityError as e:
-            raise ValidationError(e)
+        result, self.rejected = insert_instances(
+            self.child.Meta.model,
+            result,
+            method=self.context.get("ingest_method", settings.BULK_INGEST_METHOD),
+            chunk_size=self.context.get("chunk_size"),
+            mode=self.context.get("mode", MODE_INSERT),
+        )
 
         return result
 
+
+class DepartmentBulkCreateListSerializer(BulkCreateListSerializer):
     def to_representation(self, instances):
-        start = time.time()
         rep_list = []
         for instance in instances:
             rep_list.append(
@@ -53,8 +76,6 @@ class DepartmentBulkCreateListSerializer(serializers.ListSerializer):
                 )
             )
 
-        print("to_rep", time.time() - start)
-
         return rep_list
 
 
@@ -64,31 +85,26 @@ class BulkDepartmentSerializer(serializers.ModelSerializer):
         instance = Department(**validated_data)
 
         if isinstance(self._kwargs["data"], dict):
-            instance.save()
+            try:
+                with transaction.atomic():
+                    instance.save(force_insert=True)
+                    instance.row_version = stamp_row_versions(instance.__class__, [instance.pk])
+            except IntegrityError as e:
+                raise ValidationError(e)
 
         return instance
 
     class Meta:
         model = Department
-        fields = '__all__'
+        fields = ('id', 'department')
         read_only_fields = ()
+        # Duplicate ids are reported by bulk_create, not with one query per row
+        extra_kwargs = {"id": {"validators": []}}
         list_serializer_class = DepartmentBulkCreateListSerializer
 
 
-class JobBulkCreateListSerializer(serializers.ListSerializer):
-    def create(self, validated_data):
-
-        result = [self.child.create(attrs) for attrs in validated_data]
-
-        try:
-            self.child.Meta.model.objects.bulk_create(result)
-        except IntegrityError as e:
-            raise ValidationError(e)
-
-        return result
-
+class JobBulkCreateListSerializer(BulkCreateListSerializer):
     def to_representation(self, instances):
-        start = time.time()
         rep_list = []
         for instance in instances:
             rep_list.append(
@@ -98,8 +114,6 @@ class JobBulkCreateListSerializer(serializers.ListSerializer):
                 )
             )
 
-        print("to_rep", time.time() - start)
-
         return rep_list
 
 
@@ -109,45 +123,81 @@ class BulkJobSerializer(serializers.ModelSerializer):
         instance = Job(**validated_data)
 
         if isinstance(self._kwargs["data"], dict):
-            instance.save()
+            try:
+                with transaction.atomic():
+                    instance.save(force_insert=True)
+                    instance.row_version = stamp_row_versions(instance.__class__, [instance.pk])
+            except IntegrityError as e:
+                raise ValidationError(e)
 
         return instance
         
     class Meta:
         model = Job
-        fields = '__all__'
+        fields = ('id', 'job')
         read_only_fields = ()
+        # Duplicate ids are reported by bulk_create, not with one query per row
+        extra_kwargs = {"id": {"validators": []}}
         list_serializer_class = JobBulkCreateListSerializer
 
 
-class HiredEmployeeBulkCreateListSerializer(serializers.ListSerializer):
-    def create(self, validated_data):
-
-        result = [self.child.create(attrs) for attrs in validated_data]
-
-        try:
-            self.child.Meta.model.objects.bulk_create(result)
-        except IntegrityError as e:
-            raise ValidationError(e)
-
-        return result
-
+class HiredEmployeeBulkCreateListSerializer(BulkCreateListSerializer):
+    def to_representation(self, instances):
+        # Read the foreign key ids from the row instead of loading the related objects
+        datetime_field = self.child.fields["datetime"]
+        rep_list = []
+        for instance in instances:
+            rep_list.append(
+                dict(
+                    id=instance.id,
+                    name=instance.name,
+                    datetime=datetime_field.to_representation(instance.datetime) if instance.datetime else None,
+                    department_id=instance.department_id_id,
+                    job_id=instance.job_id_id,
+                )
+            )
 
+        return rep_list
 
 
 class BulkHiredEmployeeSerializer(serializers.ModelSerializer):
+    department_id = ModelObjectIdField()
+    job_id = ModelObjectIdField()
+
     def create(self, validated_data):
         instance = HiredEmployee(**validated_data)
 
         if isinstance(self._kwargs["data"], dict):
-            instance.save()
+            with transaction.atomic():
+                previous = existing_hires([instance.pk])
+                ensure_employee_partitions([instance])
+                instance.save()
+                update_hiring_summary(hires_of([instance]), previous.values())
+                instance.row_version = stamp_row_versions(HiredEmployee, [instance.pk])
 
         return instance
 
     class Meta:
         model = HiredEmployee
-        fields = '__all__'
+        fields = ('id', 'name', 'datetime', 'department_id', 'job_id')
         read_only_fields = ()
+        # Duplicate ids are reported by bulk_create, not with one query per row
+        extra_kwargs = {"id": {"validators": []}}
         list_serializer_class = HiredEmployeeBulkCreateListSerializer
 
 
+class IngestJobSerializer(serializers.ModelSerializer):
+    rows_per_second = serializers.ReadOnlyField()
+
+    class Meta:
+        model = IngestJob
+        exclude = ('payload_file',)
+        read_only_fields = ()
+
+
+class RejectedRecordSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = RejectedRecord
+        fields = '__all__'
+        read_only_fields = ('attempts', 'created_at', 'last_replayed_at')
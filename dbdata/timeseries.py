@@ -0,0 +1,99 @@
+# dbchallenge/dbdata/timeseries.py
+
+from datetime import date, timedelta
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils.dateparse import parse_date
+from .models import HiringDailySummary, HiringMonthlySummary
+
+# Rollup read for each granularity: the coarsest one whose periods fit in the buckets
+GRANULARITIES = {
+    "day": (HiringDailySummary, "day"),
+    "week": (HiringDailySummary, "day"),
+    "month": (HiringMonthlySummary, "month"),
+    "quarter": (HiringMonthlySummary, "month"),
+}
+
+# Breakdowns of the series: the columns they add and their types
+GROUP_BY = {
+    "department": (["department_id", "department_id__department"], ["department_id", "department"], ["int", "str"]),
+    "job": (["job_id", "job_id__job"], ["job_id", "job"], ["int", "str"]),
+}
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket that holds a day; weeks start on Monday"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    """First day of the bucket that follows the one starting on start"""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    months = 3 if granularity == "quarter" else 1
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def parse_group_by(value):
+    """Parse "department", "job" or "department,job" into a list of breakdowns"""
+    group_by = [part.strip() for part in value.split(",") if part.strip()]
+    for part in group_by:
+        if part not in GROUP_BY:
+            raise ValueError(f"Unknown group_by: {part!r}. Use department, job or both")
+    return list(dict.fromkeys(group_by))
+
+
+def parse_day(name, value):
+    """Parse an ISO 8601 date of the query string"""
+    day = parse_date(value) if value else None
+    if value and day is None:
+        raise ValueError(f"Invalid {name} date: {value!r}")
+    return day
+
+
+def hiring_timeseries(granularity, start=None, end=None, group_by=()):
+    """
+    Hires per bucket of a granularity between the start and end days, both
+    included and widened to whole buckets, optionally broken down by
+    department and/or job. Returns the columns, their types and a values_list
+    queryset of the rows, ordered by bucket.
+
+    Read from the daily or monthly rollup, never from the employee table, so
+    the cost depends on the number of days or months, not of hires.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity!r}. Use one of: {', '.join(GRANULARITIES)}")
+    if start and end and start > end:
+        raise ValueError("from is after to")
+
+    model, column = GRANULARITIES[granularity]
+    rows = model.objects.all()
+    if start:
+        rows = rows.filter(**{f"{column}__gte": bucket_start(start, granularity)})
+    if end:
+        rows = rows.filter(**{f"{column}__lt": next_bucket(bucket_start(end, granularity), granularity)})
+
+    fields, columns, types = ["period"], ["period"], ["date"]
+    for name in group_by:
+        group_fields, group_columns, group_types = GROUP_BY[name]
+        fields += group_fields
+        columns += group_columns
+        types += group_types
+
+    rows = (
+        rows.annotate(period=Trunc(column, granularity, output_field=DateField()))
+        .values(*fields)
+        .annotate(total=Sum("total"))
+        .order_by(*fields)
+        .values_list(*fields, "total")
+    )
+    return columns + ["total"], types + ["int"], rows
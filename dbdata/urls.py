@@ -2,7 +2,8 @@ from django.urls import path
 
 from .views import (DepartmentList, DepartmentListSerializer, DepartmentBulkListCreateView,
                     JobBulkListCreateView, HiredEmployeeBulkListCreateView, EmployeesHiredQuarter,
-                    EmployeesHiredDepartment, post_department_data, BackupTablesView, ListBackupsView, RestoreTableView)
+                    EmployeesHiredDepartment, HiringTimeseries, post_department_data, export_table, BackupTablesView, ListBackupsView, RestoreTableView, RestoreBackupView,
+                    IngestJobCreateView, IngestJobDetailView, RejectedRecordListView, ReplayRejectedRecordsView)
 
 
 urlpatterns = [
@@ -17,14 +18,29 @@ urlpatterns = [
     path("api/hired-employee-bulk-list-serializer/",
          HiredEmployeeBulkListCreateView.as_view(),
          name="hired-employee-bulk-list-serializer"),
+    path("api/ingest-jobs/<uuid:pk>/",
+         IngestJobDetailView.as_view(),
+         name="ingest-job"),
+    path("api/ingest-jobs/<str:table>/",
+         IngestJobCreateView.as_view(),
+         name="ingest-jobs"),
+    path("api/rejected-records/",
+         RejectedRecordListView.as_view(),
+         name="rejected-records"),
+    path("api/rejected-records/replay/",
+         ReplayRejectedRecordsView.as_view(),
+         name="replay-rejected-records"),
     path("api/employees-hired-quarter/",
          EmployeesHiredQuarter.as_view(),
          name="employees-hired-quarter"),
     path("api/employees-hired-department/",
          EmployeesHiredDepartment.as_view(),
          name="employees-hired-department"),
+    path("api/hiring-timeseries/", HiringTimeseries.as_view(), name="hiring-timeseries"),
+    path("api/export/<str:table>/", export_table, name="export-table"),
     path('client/post-department-data/', post_department_data, name='post-department-data'),
     path("api/backup/", BackupTablesView.as_view(), name="backup"),
 path("api/list-backups/", ListBackupsView.as_view(), name="list-backups"),
 path("api/restore-table/", RestoreTableView.as_view(), name="restore-table"),    
+    path("api/restore-backup/", RestoreBackupView.as_view(), name="restore-backup"),
 ]
\ No newline at end of file
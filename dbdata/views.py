@@ -1,21 +1,35 @@
 import requests
-import pandas as pd
+from collections.abc import Iterator
 from csv import DictReader
-from datetime import datetime
-from json import loads, dumps
 from django.urls import reverse
+from django.conf import settings
 from django.db import connection
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.renderers import JSONRenderer
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.parsers import FormParser, MultiPartParser
 from .serializers import (DepartmentSerializer, BulkDepartmentSerializer,
                           BulkJobSerializer, BulkHiredEmployeeSerializer,
-                          HiredEmployeeSerializer)
-from .models import Department, Job, HiredEmployee
-from .backup import backup_all_tables, list_backups, restore_table
+                          HiredEmployeeSerializer, IngestJobSerializer, RejectedRecordSerializer)
+from .models import Department, Job, HiredEmployee, IngestJob, RejectedRecord
+from .backup import backup_all_tables, backup_options, list_backups, list_manifests, restore_backup, restore_table
+from .ingest import INGEST_METHODS, INGEST_MODES, MODE_INSERT, resolve_hired_employee_foreign_keys
+from .jobs import create_ingest_job
+from .parsers import GzipJSONParser, NDJSONParser, CSVParser, AvroParser, decode_content_encoding
+from .pipeline import (BULK_SERIALIZERS, CSV_FIELDNAMES, ingest_rows, quarantine_rows,
+                       replay_rejected_records)
+from .exports import EXPORT_TABLES, export_queryset
+from .formats import FORMATS, check_format
+from .reports import QUARTERS, REPORT_FORMATS, iter_report_rows, quarter_columns
+from .rollups import parse_year_ranges, year_filter
+from .cache import versioned_cache
+from .analytics import ENGINE_SNAPSHOT, ENGINES, hiring_snapshot
+from .timeseries import hiring_timeseries, parse_day, parse_group_by
 
 
 
@@ -41,7 +55,113 @@ class DepartmentListSerializer(generics.ListCreateAPIView):
         return super(DepartmentListSerializer, self).get_serializer(*args, **kwargs)
 
 
-class DepartmentBulkListCreateView(generics.ListCreateAPIView):
+ON_ERROR_REJECT = "reject"
+ON_ERROR_QUARANTINE = "quarantine"
+
+
+def get_ingest_options(request):
+    """Read and validate the ingest options of the query string"""
+    options = {}
+
+    ingest_method = request.query_params.get("ingest", settings.BULK_INGEST_METHOD)
+    if ingest_method not in INGEST_METHODS:
+        raise ValidationError(f"Unknown ingest method: {ingest_method}")
+    options["ingest_method"] = ingest_method
+
+    mode = request.query_params.get("mode", MODE_INSERT)
+    if mode not in INGEST_MODES:
+        raise ValidationError(f"Unknown mode: {mode}")
+    options["mode"] = mode
+
+    on_error = request.query_params.get("on_error", ON_ERROR_REJECT)
+    if on_error not in (ON_ERROR_REJECT, ON_ERROR_QUARANTINE):
+        raise ValidationError(f"Unknown on_error: {on_error}")
+    options["on_error"] = on_error
+
+    chunk_size = request.query_params.get("chunk_size")
+    if chunk_size is not None:
+        if not chunk_size.isdigit() or int(chunk_size) < 1:
+            raise ValidationError(f"Invalid chunk_size: {chunk_size}")
+        options["chunk_size"] = int(chunk_size)
+
+    return options
+
+
+def is_streamed(data):
+    """Streaming parsers return a lazy iterator of rows instead of a list"""
+    return isinstance(data, Iterator)
+
+
+class BulkIngestMixin:
+    """
+    Passes the ingest options of the query string to the bulk list serializers
+    and reports partially inserted payloads with a 207 response.
+
+    NDJSON, CSV and Avro bodies are parsed from the request stream and inserted
+    in batches of chunk_size rows, answering with the counts instead of the rows.
+    Any of them, and JSON, may be sent with Content-Encoding: gzip. JSON lists
+    take the same path with ?on_error=quarantine, so invalid rows do not reject
+    the payload.
+
+    The rows rejected by the database in a 207 response, and every row
+    rejected by the streamed path, are quarantined as RejectedRecords. A JSON
+    payload that fails validation is answered with a 400 and not quarantined:
+    nothing of it was inserted, so the client fixes and resends it.
+    """
+
+    parser_classes = [GzipJSONParser, NDJSONParser, CSVParser, AvroParser, FormParser, MultiPartParser]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(get_ingest_options(self.request))
+        return context
+
+    def create(self, request, *args, **kwargs):
+        if is_streamed(request.data) or request.query_params.get("on_error") == ON_ERROR_QUARANTINE:
+            return self.create_streamed(request)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+
+        rejected = getattr(serializer, "rejected", ())
+        if rejected:
+            quarantine_rows(self.table, request.path, request.data, rejected)
+            return Response({
+                "inserted": len(serializer.instance),
+                "rejected": rejected,
+            }, status=status.HTTP_207_MULTI_STATUS)
+
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def create_streamed(self, request):
+        read, inserted, rejected = ingest_rows(
+            self.table,
+            request.data,
+            get_ingest_options(request),
+            source=request.path,
+        )
+
+        return Response({
+            "read": read,
+            "inserted": inserted,
+            "rejected": rejected,
+        }, status=status.HTTP_207_MULTI_STATUS if rejected else status.HTTP_201_CREATED)
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key: every page is one indexed range scan
+    (WHERE id > cursor ORDER BY id LIMIT n), however deep the page is.
+    """
+    ordering = "id"
+    page_size = settings.BULK_LIST_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.BULK_LIST_MAX_PAGE_SIZE
+
+
+class DepartmentBulkListCreateView(BulkIngestMixin, generics.ListCreateAPIView):
     """
     # List/Create/Update the relationships between Labels and CaptureSamples
 
@@ -49,6 +169,10 @@ class DepartmentBulkListCreateView(generics.ListCreateAPIView):
     """
 
     serializer_class = BulkDepartmentSerializer
+    queryset = Department.objects.all()
+    pagination_class = IdCursorPagination
+    table = "department"
+    csv_fieldnames = CSV_FIELDNAMES["department"]
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -59,7 +183,7 @@ class DepartmentBulkListCreateView(generics.ListCreateAPIView):
         )
 
 
-class JobBulkListCreateView(generics.ListCreateAPIView):
+class JobBulkListCreateView(BulkIngestMixin, generics.ListCreateAPIView):
     """
     # List/Create/Update the relationships between Labels and CaptureSamples
 
@@ -67,6 +191,10 @@ class JobBulkListCreateView(generics.ListCreateAPIView):
     """
 
     serializer_class = BulkJobSerializer
+    queryset = Job.objects.all()
+    pagination_class = IdCursorPagination
+    table = "job"
+    csv_fieldnames = CSV_FIELDNAMES["job"]
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -77,7 +205,7 @@ class JobBulkListCreateView(generics.ListCreateAPIView):
         )
 
 
-class HiredEmployeeBulkListCreateView(generics.ListCreateAPIView):
+class HiredEmployeeBulkListCreateView(BulkIngestMixin, generics.ListCreateAPIView):
     """
     # List/Create/Update the relationships between Labels and CaptureSamples
 
@@ -85,6 +213,10 @@ class HiredEmployeeBulkListCreateView(generics.ListCreateAPIView):
     """
 
     serializer_class = BulkHiredEmployeeSerializer
+    queryset = HiredEmployee.objects.all()
+    pagination_class = IdCursorPagination
+    table = "hired_employee"
+    csv_fieldnames = CSV_FIELDNAMES["hired_employee"]
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -95,116 +227,313 @@ class HiredEmployeeBulkListCreateView(generics.ListCreateAPIView):
         )
 
     def post(self, request, *args, **kwargs):
-        if isinstance(request.data, list):
-            for item in request.data:
-                job = Job.objects.filter(id=item["job_id"]).first()
-                department = Department.objects.filter(id=item["department_id"]).first()
-
-                if job and department:
-                    item["job_id"] = job.id
-                    item["department_id"] = department.id
-                    item["datetime"] = datetime.fromisoformat(item["datetime"])
-                else:
-                    raise ValidationError("Foreign Key does not exist")
-        else:
+        if is_streamed(request.data) or request.query_params.get("on_error") == ON_ERROR_QUARANTINE:
+            return self.create_streamed(request)
+
+        if not isinstance(request.data, list):
             raise ValidationError("Invalid Input")
 
+        errors = resolve_hired_employee_foreign_keys(request.data)
+        if errors:
+            return Response({
+                "detail": "Foreign Key does not exist",
+                "errors": errors,
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         return super(HiredEmployeeBulkListCreateView, self).post(request, *args, **kwargs)
 
 
+class IngestJobCreateView(APIView):
+    def post(self, request, table, format=None):
+        """Store a bulk payload and apply it in the background, returning the job id"""
+        if table not in BULK_SERIALIZERS:
+            return Response({
+                "status": "error",
+                "message": f"Unknown table name: {table}"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        if request.stream is None:
+            raise ValidationError("Empty payload")
+
+        options = get_ingest_options(request)
+        options["content_type"] = request.content_type.split(";")[0].strip()
+        options["content_encoding"] = request.META.get("HTTP_CONTENT_ENCODING", "identity")
+        # Reject unsupported encodings before storing the payload
+        decode_content_encoding(request.stream, options["content_encoding"])
+        options["header"] = request.query_params.get("header") in ("1", "true")
+
+        job = create_ingest_job(table, request.stream, options)
+        job.refresh_from_db()
+
+        return Response(
+            dict(
+                IngestJobSerializer(job).data,
+                url=reverse("ingest-job", kwargs={"pk": job.pk}),
+            ),
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class IngestJobDetailView(generics.RetrieveAPIView):
+    """Progress, throughput and errors of an ingest job"""
+
+    queryset = IngestJob.objects.all()
+    serializer_class = IngestJobSerializer
+
+
+class RejectedRecordPagination(PageNumberPagination):
+    page_size = settings.REJECTED_RECORDS_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RejectedRecordListView(generics.ListCreateAPIView):
+    """
+    Quarantined rows, filtered by ?table= and ?source=. Loaders can post the
+    rows they reject on the client side as a list.
+    """
+
+    serializer_class = RejectedRecordSerializer
+    pagination_class = RejectedRecordPagination
+
+    def get_queryset(self):
+        queryset = RejectedRecord.objects.order_by("id")
+        if "table" in self.request.query_params:
+            queryset = queryset.filter(table=self.request.query_params["table"])
+        if "source" in self.request.query_params:
+            queryset = queryset.filter(source=self.request.query_params["source"])
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get("data", {}), list):
+            kwargs["many"] = True
+
+        return super(RejectedRecordListView, self).get_serializer(*args, **kwargs)
+
+
+class ReplayRejectedRecordsView(APIView):
+    def post(self, request, format=None):
+        """Replay the quarantined rows of a table, or only the given ids"""
+        if not isinstance(request.data, dict):
+            return Response({
+                "status": "error",
+                "message": "Expected an object with a table and optional ids"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        table = request.data.get("table")
+        ids = request.data.get("ids")
+
+        if table not in BULK_SERIALIZERS:
+            return Response({
+                "status": "error",
+                "message": f"Unknown table name: {table}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        valid_ids = isinstance(ids, list) and all(
+            isinstance(record_id, int) and not isinstance(record_id, bool) for record_id in ids
+        )
+        if ids is not None and not valid_ids:
+            return Response({
+                "status": "error",
+                "message": "ids must be a list of RejectedRecord ids"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        options = get_ingest_options(request)
+        replayed, inserted, still_rejected = replay_rejected_records(table, ids, options)
+
+        return Response({
+            "status": "success",
+            "table": table,
+            "replayed": replayed,
+            "inserted": inserted,
+            "rejected": still_rejected,
+        }, status=status.HTTP_200_OK)
+
+
+# Year of the reports when no ?year= is given
+DEFAULT_REPORT_YEAR = 2021
+
+
+def get_report_years(request, default=str(DEFAULT_REPORT_YEAR)):
+    """Year ranges of the query string: ?year=2021, ?year=2019-2021 or ?year=2019,2021"""
+    value = request.query_params.get("year") or default
+    if not value:
+        return None
+
+    try:
+        return parse_year_ranges(value)
+    except ValueError as e:
+        raise ValidationError({"year": str(e)})
+
+
+def get_report_engine(request):
+    """Engine of the reports: ?engine=sql|snapshot, ANALYTICS_ENGINE by default"""
+    engine = request.query_params.get("engine", settings.ANALYTICS_ENGINE)
+    if engine not in ENGINES:
+        raise ValidationError({"engine": f"Unknown engine: {engine}. Use one of: {', '.join(ENGINES)}"})
+    return engine
+
+
+class ReportContentNegotiation(DefaultContentNegotiation):
+    """Always render with the first renderer: ?format= selects the report encoding, not a DRF renderer"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def report_response(request, rows, columns, types):
+    """Stream the rows of a report in the ?format= of the request (json, csv, arrow or parquet)"""
+    report_format = request.query_params.get("format", "json")
+    try:
+        check_format(report_format, REPORT_FORMATS)
+    except ValueError as e:
+        raise ValidationError({"format": str(e)})
+    except LookupError as e:
+        raise NotAcceptable(str(e))
+
+    encode, content_type = REPORT_FORMATS[report_format]
+    return StreamingHttpResponse(encode(columns, rows, types), content_type=content_type)
+
+
 class EmployeesHiredQuarter(APIView):
+    content_negotiation_class = ReportContentNegotiation
+
+    @versioned_cache(Department, Job, HiredEmployee)
     def get(self, request, format=None):
-        sql = """
+        # Read from the HiringSummary rollup, which is small whatever the size of the employee table,
+        # or from the in-process snapshot with ?engine=snapshot.
+        # The quarters are pivoted in SQL and the rows streamed straight to the response.
+        year_ranges = get_report_years(request)
+        columns = ['department', 'job'] + [str(quarter) for quarter in QUARTERS]
+        types = ['str', 'str'] + ['int' for _ in QUARTERS]
+        if get_report_engine(request) == ENGINE_SNAPSHOT:
+            return report_response(request, hiring_snapshot.hired_by_quarter(year_ranges), columns, types)
+
+        years, params = year_filter(year_ranges, "s.year")
+        sql = f"""
             SELECT 
                 d.department
                 , j.job
-                , extract(quarter from h.datetime) as quarter
-                , count(*) total
-            FROM dbdata_hiredemployee h
-            INNER JOIN dbdata_department d on h.department_id_id = d.id
-            INNER JOIN dbdata_job j ON h.job_id_id = j.id
-            WHERE extract(YEAR from h.datetime) = 2021
-            GROUP BY 1,2,3
+                , {quarter_columns("s.quarter", "s.total")}
+            FROM dbdata_hiringsummary s
+            INNER JOIN dbdata_department d on s.department_id_id = d.id
+            INNER JOIN dbdata_job j ON s.job_id_id = j.id
+            WHERE {years}
+            GROUP BY 1,2
             ORDER BY 1,2
         """
 
-        with connection.cursor() as cursor:
-            cursor.execute(sql)
-            hired_employee = cursor.fetchall()
-
-        df = pd.DataFrame(hired_employee, columns=['department', 'job', 'quarter', 'total'])
-        df_rst = df.pivot_table('total', ['department', 'job'], 'quarter').reset_index()
-        df_rst.fillna(0, inplace=True)
-
-        print(df_rst)
-
-        result = df_rst.to_json(orient="index")
-        parsed = loads(result)
-        df_dumps = dumps(parsed, indent=4)
-
-        return HttpResponse(df_dumps, content_type='application/json')
+        return report_response(request, iter_report_rows(sql, params), columns, types)
 
 
 class EmployeesHiredDepartment(APIView):
+    content_negotiation_class = ReportContentNegotiation
+
+    @versioned_cache(Department, Job, HiredEmployee)
     def get(self, request, format=None):
-        sql = """
+        # All-time totals by department, compared with the mean hires of a
+        # department per year over the requested years
+        year_ranges = get_report_years(request)
+        columns = ['id', 'department', 'total']
+        types = ['int', 'str', 'int']
+        if get_report_engine(request) == ENGINE_SNAPSHOT:
+            return report_response(request, hiring_snapshot.hired_by_department(year_ranges), columns, types)
+
+        years, params = year_filter(year_ranges, "s.year")
+        sql = f"""
             with totals as (
                 SELECT 
                     d.id
                     , d.department
-                    , count(h.id) total
-                FROM dbdata_hiredemployee h
-                INNER JOIN dbdata_department d on h.department_id_id = d.id
+                    , sum(s.total) total
+                FROM dbdata_hiringsummary s
+                INNER JOIN dbdata_department d on s.department_id_id = d.id
                 GROUP BY 1,2
-            ), totals_2021 as (
+            ), totals_year as (
                 SELECT 
-                    extract(YEAR from h.datetime) hired_year
-                    , d.id
-                    , d.department
-                    , count(h.id) total
-                FROM dbdata_hiredemployee h
-                INNER JOIN dbdata_department d on h.department_id_id = d.id
-                WHERE extract(YEAR from h.datetime) = 2021
-                GROUP BY 1,2,3
-            ), average_year_2021 as (
+                    s.year hired_year
+                    , s.department_id_id
+                    , sum(s.total) total
+                FROM dbdata_hiringsummary s
+                WHERE {years}
+                GROUP BY 1,2
+            ), average_year as (
                 SELECT 
-                    t.hired_year, 
-                    avg(t.total) average_year_2021
-                FROM totals_2021 t
-                GROUP BY 1
-            ), total_average as (
+                    avg(t.total) average_year
+                FROM totals_year t
+            ), result as (
                 SELECT
                     t.id
                     , t.department
                     , t.total
-                    , ay.average_year_2021
-                FROM totals t, average_year_2021 ay
-            ), result as (
-                SELECT
-                    ta.id
-                    , ta.department
-                    , ta.total
-                FROM total_average ta
-                WHERE ta.total > ta.average_year_2021
-                ORDER BY ta.total DESC
+                FROM totals t, average_year ay
+                WHERE t.total > ay.average_year
             )
             select *
             from result
+            ORDER BY total DESC
 
         """
 
-        with connection.cursor() as cursor:
-            cursor.execute(sql)
-            hired_employee = cursor.fetchall()
+        return report_response(request, iter_report_rows(sql, params), columns, types)
+
 
-        df = pd.DataFrame(hired_employee, columns=['id', 'department', 'total'])
+class HiringTimeseries(APIView):
+    content_negotiation_class = ReportContentNegotiation
+
+    @versioned_cache(Department, Job, HiredEmployee)
+    def get(self, request, format=None):
+        # ?granularity=day|week|month|quarter&from=2019-01-01&to=2021-12-31&group_by=department,job
+        params = request.query_params
+        try:
+            start = parse_day("from", params.get("from"))
+            end = parse_day("to", params.get("to"))
+            group_by = parse_group_by(params.get("group_by", ""))
+            columns, types, rows = hiring_timeseries(params.get("granularity", "month"), start, end, group_by)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
 
-        result = df.to_json(orient="index")
-        parsed = loads(result)
-        df_dumps = dumps(parsed, indent=4)
+        return report_response(request, rows.iterator(), columns, types)
 
-        return HttpResponse(df_dumps, content_type='application/json')
 
+# Output formats of the exports
+EXPORT_FORMATS = FORMATS
+
+
+def export_table(request, table):
+    """
+    Stream the rows of a table as CSV, NDJSON, JSON, Arrow or Parquet. A
+    plain Django view: DRF would treat ?format= as a renderer override.
+    """
+    if table not in EXPORT_TABLES:
+        return JsonResponse({
+            "status": "error",
+            "message": f"Unknown table name: {table}"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    export_format = request.GET.get("format", "csv")
+    try:
+        check_format(export_format, EXPORT_FORMATS)
+        columns, types, rows = export_queryset(table, request.GET)
+    except ValueError as e:
+        return JsonResponse({
+            "status": "error",
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except LookupError as e:
+        return JsonResponse({
+            "status": "error",
+            "message": str(e)
+        }, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    # iterator() reads the rows with a server-side cursor on PostgreSQL
+    encode, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        encode(columns, rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), types),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{table}.{export_format}"'
+    return response
 
 
 def post_department_data(request):
@@ -233,14 +562,39 @@ def post_department_data(request):
 # Add this class at the end of the file
 class BackupTablesView(APIView):
     def get(self, request, format=None):
-        """Backup all tables to AVRO format"""
+        """
+        Backup all tables to AVRO format, with ?year= only the employees hired in
+        those years, with ?incremental=true only the rows added since the latest
+        backup. ?codec=, ?level= and ?sync_interval= override the settings.
+        """
+        year_ranges = get_report_years(request, default=None)
         try:
-            backup_files = backup_all_tables()
+            options = backup_options(
+                request.query_params.get("codec"),
+                request.query_params.get("level"),
+                request.query_params.get("sync_interval"),
+            )
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        incremental = request.query_params.get("incremental", "").lower() in ("1", "true", "yes")
+        try:
+            manifest = backup_all_tables(year_ranges, options, incremental)
             return Response({
                 "status": "success",
                 "message": "Backup completed successfully",
-                "files": backup_files
+                "files": manifest["files"],
+                "manifest": manifest["manifest"],
+                "kind": manifest["kind"],
             }, status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({
+                "status": "error",
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "status": "error",
@@ -256,7 +610,8 @@ class ListBackupsView(APIView):
             backups = list_backups()
             return Response({
                 "status": "success",
-                "backups": backups
+                "backups": backups,
+                "manifests": list_manifests()
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({
@@ -288,4 +643,28 @@ class RestoreTableView(APIView):
             return Response({
                 "status": "error",
                 "message": str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class RestoreBackupView(APIView):
+    def post(self, request, format=None):
+        """Restore every table from a backup manifest, replaying its chain of incremental backups"""
+        manifest = request.data.get('manifest')
+        if not manifest:
+            return Response({
+                "status": "error",
+                "message": "manifest is required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            records_restored = restore_backup(manifest)
+            return Response({
+                "status": "success",
+                "message": f"Successfully restored the backup {manifest}",
+                "records_restored": records_restored
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "message": str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
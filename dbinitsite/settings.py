@@ -131,4 +131,60 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-AUTH_USER_MODEL = 'dbdata.CustomUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'dbdata.CustomUser'
+
+# Bulk ingest
+# "bulk_create" or "copy" (COPY FROM STDIN, PostgreSQL only; falls back to bulk_create)
+
+BULK_INGEST_METHOD = os.environ.get("BULK_INGEST_METHOD", "bulk_create")
+BULK_INGEST_CHUNK_SIZE = int(os.environ.get("BULK_INGEST_CHUNK_SIZE", 5000))
+
+# Ingest jobs: payloads are stored in INGEST_JOB_DIR and applied by a pool of
+# INGEST_JOB_WORKERS threads per process (0 applies them inside the request)
+
+INGEST_JOB_DIR = os.environ.get("INGEST_JOB_DIR", os.path.join(BASE_DIR, "ingest_jobs"))
+INGEST_JOB_WORKERS = int(os.environ.get("INGEST_JOB_WORKERS", 2))
+INGEST_JOB_MAX_ERRORS = int(os.environ.get("INGEST_JOB_MAX_ERRORS", 1000))
+
+# Avro and gzip encoded request bodies are spooled to a temporary file once they exceed this size
+AVRO_SPOOL_MAX_MEMORY = int(os.environ.get("AVRO_SPOOL_MAX_MEMORY", 16 * 1024 * 1024))
+
+# Page size of api/rejected-records/
+REJECTED_RECORDS_PAGE_SIZE = int(os.environ.get("REJECTED_RECORDS_PAGE_SIZE", 100))
+
+# In-process LRU cache of the report responses, per worker process
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 256))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Page size of the GET *-bulk-list-serializer endpoints (cursor pagination on id)
+BULK_LIST_PAGE_SIZE = int(os.environ.get("BULK_LIST_PAGE_SIZE", 1000))
+BULK_LIST_MAX_PAGE_SIZE = int(os.environ.get("BULK_LIST_MAX_PAGE_SIZE", 10000))
+
+# Rows fetched per round trip by the streamed table exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# Engine of the reports: "sql" (queries over the HiringSummary rollup) or
+# "snapshot" (NumPy columnar copy of the employees in each worker process).
+# Overridden per request with ?engine=
+
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "sql")
+
+# Rows read per round trip by the backups
+BACKUP_CHUNK_SIZE = int(os.environ.get("BACKUP_CHUNK_SIZE", 5000))
+
+# Threads of the parallel backup (PostgreSQL) and the ids fetched by each of their tasks
+BACKUP_WORKERS = int(os.environ.get("BACKUP_WORKERS", 4))
+BACKUP_RANGE_SIZE = int(os.environ.get("BACKUP_RANGE_SIZE", 100000))
+
+# AVRO writer of the backups: codec (null, deflate, bzip2, xz, and snappy or
+# zstandard when installed), compression level (the codec default when empty)
+# and sync interval, the uncompressed bytes per block
+
+BACKUP_CODEC = os.environ.get("BACKUP_CODEC", "null")
+BACKUP_COMPRESSION_LEVEL = os.environ.get("BACKUP_COMPRESSION_LEVEL") or None
+BACKUP_SYNC_INTERVAL = int(os.environ.get("BACKUP_SYNC_INTERVAL", 16000))
+
+# Restores insert the rows of a backup in batches, with "copy" (COPY FROM STDIN,
+# PostgreSQL only; falls back to bulk_create) or "bulk_create"
+RESTORE_METHOD = os.environ.get("RESTORE_METHOD", "copy")
+RESTORE_BATCH_SIZE = int(os.environ.get("RESTORE_BATCH_SIZE", 10000))
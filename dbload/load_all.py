@@ -0,0 +1,27 @@
+import sys
+from load_bulk_department import load_bulk_department
+from load_bulk_jobs import load_bulk_job
+from load_bulk_hired_employees import load_bulk_hired_employees
+
+
+def load_all(chunk_size=1000, workers=4):
+    """
+    Load every historic file in foreign key order: employees reference
+    departments and jobs, so each table finishes before the next starts
+    """
+    for load in (load_bulk_department, load_bulk_job, load_bulk_hired_employees):
+        summary = load(chunk_size=chunk_size, workers=workers)
+        if summary['failed_chunks']:
+            print("Stopping: the next table depends on this one")
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        load_all(chunk_size=int(sys.argv[1]), workers=int(sys.argv[2]))
+    elif len(sys.argv) == 1:
+        load_all()
+    else:
+        print("Usage:")
+        print("  python load_all.py [<chunk_size> <workers>]")
@@ -1,34 +1,19 @@
-import json
-import requests
-from csv import DictReader
+from loader import load_csv, print_summary
 
 
-def load_bulk_department():
-    url = 'http://localhost:8000/api/departments-bulk-list-serializer/'
-
-    data = []
-    with open('../historic_data/departments.csv') as f:
-        cf = DictReader(f, fieldnames=['id', 'department'])
-        for row in cf:
-            data.append(
-                {
-                    'id': row['id'],
-                    'department': row['department']
-                }
-            )
-
-    response = requests.post(
-        url,
-        headers={'Content-type': 'application/json'},
-        data=json.dumps(
-            data
-        )
+def load_bulk_department(chunk_size=1000, workers=4):
+    summary = load_csv(
+        '/api/departments-bulk-list-serializer/',
+        '../historic_data/departments.csv',
+        fieldnames=['id', 'department'],
+        chunk_size=chunk_size,
+        workers=workers,
     )
 
     print("Result")
-    print(response.json())
+    print_summary('departments', summary)
+    return summary
 
 
 if __name__ == '__main__':
     load_bulk_department()
-
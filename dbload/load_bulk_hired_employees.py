@@ -1,51 +1,25 @@
-import json
-import requests
-from csv import DictReader
+from loader import load_csv, print_summary
 
 
-def load_bulk_hired_employees():
-    url = 'http://localhost:8000/api/hired-employee-bulk-list-serializer/'
+def is_complete(row):
+    return bool(row['id'] and row['name'] and row['datetime'] and row['department_id'] and row['job_id'])
 
-    data = []
-    error_data = []
-    with open('../historic_data/hired_employees.csv') as f:
-        cf = DictReader(f, fieldnames=['id', 'name', 'datetime', 'department_id', 'job_id'])
-        for row in cf:
-            if row['id'] and row['name'] and row['datetime'] and row['department_id'] and row['job_id']:
-                data.append(
-                    {
-                        "id": row['id'],
-                        "name": row['name'],
-                        "datetime": row['datetime'],
-                        "department_id": row['department_id'],
-                        "job_id": row['job_id']
-                    }
-                )
-            else:
-                error_data.append(
-                    {
-                        "id": row['id'],
-                        "name": row['name'],
-                        "datetime": row['datetime'],
-                        "department_id": row['department_id'],
-                        "job_id": row['job_id']
-                    }
-                )
 
-    response = requests.post(
-        url,
-        headers={'Content-type': 'application/json'},
-        data=json.dumps(
-            data
-        )
+def load_bulk_hired_employees(chunk_size=1000, workers=4):
+    summary = load_csv(
+        '/api/hired-employee-bulk-list-serializer/',
+        '../historic_data/hired_employees.csv',
+        fieldnames=['id', 'name', 'datetime', 'department_id', 'job_id'],
+        chunk_size=chunk_size,
+        workers=workers,
+        is_valid=is_complete,
+        table='hired_employee',
     )
 
     print("Result")
-    print(response.json())
-    print("Data with error")
-    print(error_data)
+    print_summary('hired employees', summary)
+    return summary
 
 
 if __name__ == '__main__':
     load_bulk_hired_employees()
-
@@ -1,34 +1,19 @@
-import json
-import requests
-from csv import DictReader
+from loader import load_csv, print_summary
 
 
-def load_bulk_job():
-    url = 'http://localhost:8000/api/job-bulk-list-serializer/'
-
-    data = []
-    with open('../historic_data/jobs.csv') as f:
-        cf = DictReader(f, fieldnames=['id', 'job'])
-        for row in cf:
-            data.append(
-                {
-                    'id': row['id'],
-                    'job': row['job']
-                }
-            )
-
-    response = requests.post(
-        url,
-        headers={'Content-type': 'application/json'},
-        data=json.dumps(
-            data
-        )
+def load_bulk_job(chunk_size=1000, workers=4):
+    summary = load_csv(
+        '/api/job-bulk-list-serializer/',
+        '../historic_data/jobs.csv',
+        fieldnames=['id', 'job'],
+        chunk_size=chunk_size,
+        workers=workers,
     )
 
     print("Result")
-    print(response.json())
+    print_summary('jobs', summary)
+    return summary
 
 
 if __name__ == '__main__':
     load_bulk_job()
-
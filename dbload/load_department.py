@@ -5,12 +5,13 @@ from csv import DictReader
 def load_department():
     url = 'http://localhost:8000/api/departments/'
 
-    with open('../historic_data/departments.csv') as f:
+    # One session keeps the connection alive across the per-row requests
+    with requests.Session() as session, open('../historic_data/departments.csv') as f:
         cf = DictReader(f, fieldnames=['id', 'department'])
         for row in cf:
             print(row)
 
-            response = requests.post(
+            response = session.post(
                 url,
                 data={
                     'id': int(row['id']),
@@ -0,0 +1,161 @@
+# dbchallenge/dbload/loader.py
+import json
+import time
+import requests
+from csv import DictReader
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+
+BASE_URL = 'http://localhost:8000'
+
+# Status codes worth retrying: the server was busy or restarting
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def get_session(pool_size=8):
+    """
+    Session with a connection pool big enough for every worker, so chunks
+    reuse keep-alive connections instead of opening one per request
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Content-type': 'application/json'})
+    return session
+
+
+def read_chunks(path, fieldnames, chunk_size, is_valid=None, error_data=None):
+    """
+    Read a CSV file lazily and yield lists of at most chunk_size rows.
+    Rows rejected by is_valid are appended to error_data instead.
+    """
+    chunk = []
+    with open(path) as f:
+        cf = DictReader(f, fieldnames=fieldnames)
+        for row in cf:
+            if is_valid and not is_valid(row):
+                if error_data is not None:
+                    error_data.append(row)
+                continue
+
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def post_chunk(session, url, chunk, params=None, retries=3, backoff=0.5):
+    """Post one chunk, retrying connection errors and busy responses with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, params=params, data=json.dumps(chunk))
+            if response.status_code not in RETRY_STATUS:
+                return response
+        except requests.ConnectionError:
+            if attempt == retries:
+                raise
+
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt))
+
+    return response
+
+
+def quarantine_rows(session, table, rows, reason, chunk_size=1000):
+    """Store rows rejected on the client side in the server's quarantine, to replay them later"""
+    url = f'{BASE_URL}/api/rejected-records/'
+    for start in range(0, len(rows), chunk_size):
+        records = [
+            {'table': table, 'source': 'dbload', 'payload': row, 'reason': reason}
+            for row in rows[start:start + chunk_size]
+        ]
+        post_chunk(session, url, records)
+
+
+def load_csv(endpoint, path, fieldnames, chunk_size=1000, workers=4, retries=3, backoff=0.5,
+             params=None, is_valid=None, session=None, table=None):
+    """
+    Load a CSV file into a bulk endpoint, sending chunks concurrently.
+
+    At most `workers` requests are in flight and at most twice that many
+    chunks are read ahead, so the file is never held in memory. Retried
+    chunks may be applied twice; use params={'mode': 'ignore'} or 'upsert'
+    to make them idempotent. When a table is given, the rows rejected by
+    is_valid are quarantined on the server.
+    """
+    url = f'{BASE_URL}{endpoint}'
+    session = session or get_session(workers)
+    summary = {
+        'rows': 0,
+        'inserted': 0,
+        'rejected': [],
+        'failed_chunks': [],
+        'error_data': [],
+    }
+
+    def collect(future):
+        chunk = pending.pop(future)
+        try:
+            response = future.result()
+        except requests.RequestException as e:
+            summary['failed_chunks'].append({'rows': len(chunk), 'error': str(e)})
+            return
+
+        if response.status_code == 201:
+            summary['inserted'] += len(chunk)
+        elif response.status_code == 207:
+            result = response.json()
+            summary['inserted'] += result['inserted']
+            summary['rejected'].extend(
+                {'id': chunk[row['index']]['id'], 'reason': row['reason']} for row in result['rejected']
+            )
+        else:
+            summary['failed_chunks'].append({
+                'rows': len(chunk),
+                'status': response.status_code,
+                'error': response.text[:500],
+            })
+
+    start = time.time()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in read_chunks(path, fieldnames, chunk_size, is_valid, summary['error_data']):
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+
+            summary['rows'] += len(chunk)
+            future = executor.submit(post_chunk, session, url, chunk, params, retries, backoff)
+            pending[future] = chunk
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(future)
+
+    if table and summary['error_data']:
+        quarantine_rows(session, table, summary['error_data'], 'incomplete row')
+
+    elapsed = time.time() - start
+    summary['seconds'] = round(elapsed, 2)
+    summary['rows_per_second'] = round(summary['rows'] / elapsed) if elapsed else 0
+
+    return summary
+
+
+def print_summary(name, summary):
+    """Print the result of a load_csv call"""
+    print(f"{name}: {summary['rows']} rows sent, {summary['inserted']} inserted "
+          f"in {summary['seconds']}s ({summary['rows_per_second']} rows/s)")
+    if summary['rejected']:
+        print(f"Rejected by the server: {summary['rejected']}")
+    if summary['failed_chunks']:
+        print(f"Failed chunks: {summary['failed_chunks']}")
+    if summary['error_data']:
+        print("Data with error")
+        print(summary['error_data'])
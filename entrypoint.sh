@@ -21,7 +21,13 @@ python manage.py makemigrations dbdata
 # Apply migrations before flush
 python manage.py migrate
 
-# Only flush after migrations have been applied
-python manage.py flush --no-input
+# Only flush after migrations have been applied, and only when asked to
+if [ "$FLUSH_DATABASE" = "1" ]
+then
+    python manage.py flush --no-input
+fi
+
+# Ingest jobs run in threads of the server process and do not survive a restart
+python manage.py recover_ingest_jobs
 
 exec "$@"
\ No newline at end of file
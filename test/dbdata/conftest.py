@@ -0,0 +1,20 @@
+import pytest
+
+from dbdata.analytics import hiring_snapshot
+from dbdata.cache import response_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # Table versions start over with every test database, so cached responses must not outlive a test
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_hiring_snapshot():
+    # Same for the analytics snapshot, which is refreshed by table version
+    hiring_snapshot.clear()
+    yield
+    hiring_snapshot.clear()
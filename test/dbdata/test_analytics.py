@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.analytics import hiring_snapshot
+
+
+def report(client, name, query=""):
+    response = client.get(reverse(name) + query)
+    assert response.status_code == status.HTTP_200_OK
+    return list(json.loads(response.getvalue()).values())
+
+
+def post_employees(client, data, query=""):
+    return client.post(
+        reverse("hired-employee-bulk-list-serializer") + query,
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+
+
+def employee(id, datetime, department_id, job_id):
+    return {"id": id, "name": f"Employee {id}", "datetime": datetime, "department_id": department_id, "job_id": job_id}
+
+
+@pytest.fixture
+def hires(client):
+    departments = [{"id": i, "department": name} for i, name in enumerate(["Sales", "Accounting", "Legal"], 1)]
+    jobs = [{"id": i, "job": name} for i, name in enumerate(["Seller", "Accountant"], 1)]
+    client.post(reverse("departments-bulk-list-serializer"), data=json.dumps(departments), content_type="application/json")
+    client.post(reverse("job-bulk-list-serializer"), data=json.dumps(jobs), content_type="application/json")
+    data = [
+        employee(1, "2021-01-10T00:00:00Z", 1, 1),
+        employee(2, "2021-02-10T00:00:00Z", 1, 1),
+        employee(3, "2021-07-10T00:00:00Z", 2, 2),
+        employee(4, "2020-12-10T00:00:00Z", 2, 2),
+        employee(5, "2020-11-10T00:00:00Z", 3, 2),
+        employee(6, None, 3, 1),
+        employee(7, "2019-04-01T00:00:00Z", 1, 2),
+    ]
+    assert post_employees(client, data).status_code == status.HTTP_201_CREATED
+    return data
+
+
+def assert_engines_agree(client):
+    for name in ("employees-hired-quarter", "employees-hired-department"):
+        for year in ("2021", "2020", "2019-2021", "2019,2021", "1999"):
+            assert report(client, name, f"?year={year}&engine=snapshot") == report(client, name, f"?year={year}&engine=sql")
+
+
+@pytest.mark.django_db
+def test_snapshot_engine_matches_sql(client, hires):
+    assert_engines_agree(client)
+    assert report(client, "employees-hired-quarter", "?engine=snapshot") == [
+        {"department": "Accounting", "job": "Accountant", "1": 0, "2": 0, "3": 1, "4": 0},
+        {"department": "Sales", "job": "Seller", "1": 2, "2": 0, "3": 0, "4": 0},
+    ]
+
+    response = client.get(reverse("employees-hired-quarter") + "?engine=numba")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_snapshot_refresh(client, hires):
+    assert_engines_agree(client)
+    loaded = len(hiring_snapshot.years)
+
+    # New ids are appended to the snapshot
+    assert post_employees(client, [employee(8, "2021-10-01T00:00:00Z", 3, 1)]).status_code == status.HTTP_201_CREATED
+    assert_engines_agree(client)
+    assert len(hiring_snapshot.years) == loaded + 1
+
+    # Updated rows are caught by the comparison with the rollup
+    moved = employee(1, "2020-05-01T00:00:00Z", 2, 1)
+    assert post_employees(client, [moved], "?mode=upsert").status_code == status.HTTP_201_CREATED
+    assert_engines_agree(client)
+
+    # So are rows inserted below the highest id, and new departments
+    client.post(reverse("departments"), data={"id": 4, "department": "Marketing"})
+    assert post_employees(client, [employee(0, "2021-03-01T00:00:00Z", 4, 2)]).status_code == status.HTTP_201_CREATED
+    assert_engines_agree(client)
+    assert len(hiring_snapshot.years) == loaded + 2
@@ -0,0 +1,183 @@
+import datetime
+import json
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.backup import (backup_all_tables, backup_options, id_ranges, list_manifests, metadata_file,
+                           restore_backup, restore_table)
+from dbdata.ingest import MODE_UPSERT, insert_instances
+from dbdata.models import Department, Job, HiredEmployee
+
+
+def employee_rows():
+    return list(HiredEmployee.objects.order_by("id").values_list("id", "name", "datetime", "department_id", "job_id"))
+
+
+@pytest.fixture
+def tables(settings, tmp_path):
+    settings.BASE_DIR = tmp_path
+    settings.BACKUP_CHUNK_SIZE = 2
+    for i in (1, 2):
+        Department.objects.create(id=i, department=f"Department {i}")
+        Job.objects.create(id=i, job=f"Job {i}")
+    HiredEmployee.objects.bulk_create([
+        HiredEmployee(
+            id=i,
+            name=f"Employee {i}" if i != 3 else None,
+            datetime=datetime.datetime(2021, i, 1, 12, tzinfo=datetime.timezone.utc) if i != 4 else None,
+            department_id_id=1 + i % 2,
+            job_id_id=1 + i // 3 % 2,
+        )
+        for i in range(1, 6)
+    ])
+
+
+@pytest.mark.django_db
+def test_backup_and_restore(tables, django_assert_max_num_queries):
+    expected = employee_rows()
+
+    # One query per table and one for their versions in one transaction: no query per employee
+    with django_assert_max_num_queries(6):
+        files = backup_all_tables()["files"]
+
+    HiredEmployee.objects.filter(id__in=[1, 2]).delete()
+    HiredEmployee.objects.filter(id=3).update(name="Changed")
+
+    assert restore_table("hired_employee", files["hired_employee"]) == 5
+    assert employee_rows() == expected
+    assert restore_table("department", files["department"]) == 2
+
+
+@pytest.mark.django_db
+def test_id_ranges(tables):
+    assert id_ranges(HiredEmployee.objects.all(), 2) == [(1, 3), (3, 5), (5, 6)]
+    assert id_ranges(HiredEmployee.objects.filter(id__gt=9), 2) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_backup(tables, settings, monkeypatch):
+    # The workers of the PostgreSQL path, without the exported snapshot
+    def in_snapshot(snapshot_id, function):
+        def run(*args):
+            try:
+                return function(*args)
+            finally:
+                connection.close()
+        return run
+
+    monkeypatch.setattr("dbdata.backup.export_snapshot", lambda: "snapshot")
+    monkeypatch.setattr("dbdata.backup.in_snapshot", in_snapshot)
+    settings.BACKUP_WORKERS = 3
+    settings.BACKUP_RANGE_SIZE = 2
+    expected = employee_rows()
+
+    files = backup_all_tables()["files"]
+    HiredEmployee.objects.all().delete()
+    assert restore_table("hired_employee", files["hired_employee"]) == 5
+    assert employee_rows() == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("codec, level", [("deflate", 9), ("deflate", None), ("xz", 1), ("bzip2", 5)])
+def test_backup_codecs(tables, codec, level):
+    expected = employee_rows()
+    files = backup_all_tables(options=backup_options(codec, level, 64))["files"]
+
+    with open(metadata_file(files["hired_employee"])) as f:
+        stats = json.load(f)
+    assert stats["codec"] == codec
+    assert stats["level"] == level
+    assert stats["sync_interval"] == 64
+    assert stats["rows"] == 5
+    assert stats["encoded_bytes"] > 0 and stats["compression_ratio"] > 0
+
+    HiredEmployee.objects.all().delete()
+    assert restore_table("hired_employee", files["hired_employee"]) == 5
+    assert employee_rows() == expected
+
+
+@pytest.mark.parametrize("params", [
+    {"codec": "lz4"},
+    {"codec": "null", "level": "1"},
+    {"codec": "deflate", "level": "10"},
+    {"sync_interval": "-1"},
+])
+def test_backup_options_errors(client, params, settings):
+    settings.BACKUP_CODEC = "deflate"
+    with pytest.raises(ValueError):
+        backup_options(params.get("codec"), params.get("level"), params.get("sync_interval"))
+    assert client.get(reverse("backup"), params).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_incremental_backups(tables, client):
+    with pytest.raises(ValueError):
+        backup_all_tables(incremental=True)
+
+    full = backup_all_tables()
+    assert full["versions"] == {"department": 0, "job": 0, "hired_employee": 0}
+
+    insert_instances(HiredEmployee, [HiredEmployee(id=10, name="Employee 10", department_id_id=1, job_id_id=1)])
+    first = backup_all_tables(incremental=True)
+    assert first["base"] == full["manifest"]
+    assert first["rows"] == {"department": 0, "job": 0, "hired_employee": 1}
+    assert first["versions"] == {"department": 0, "job": 0, "hired_employee": 1}
+
+    # Ids below the highest one backed up and updated rows are written since the base too
+    insert_instances(Department, [Department(id=3, department="Department 3"), Department(id=1, department="Renamed")],
+                     mode=MODE_UPSERT)
+    insert_instances(HiredEmployee, [
+        HiredEmployee(id=6, name="Employee 6", department_id_id=3, job_id_id=2),
+        HiredEmployee(id=2, name="Changed", department_id_id=1, job_id_id=1),
+    ], mode=MODE_UPSERT)
+    response = client.get(reverse("backup"), {"incremental": "true"})
+    assert response.status_code == status.HTTP_200_OK
+    second = list_manifests()[0]
+    assert second["manifest"] == response.json()["manifest"]
+    assert second["base"] == first["manifest"]
+    assert second["rows"] == {"department": 2, "job": 0, "hired_employee": 2}
+    assert second["versions"] == {"department": 1, "job": 0, "hired_employee": 2}
+    expected = employee_rows()
+
+    # Replaying the chain gives back every row, also after a restore of the full backup alone
+    HiredEmployee.objects.filter(id__in=[2, 6]).delete()
+    restore_backup(full["manifest"])
+    assert len(employee_rows()) == 5
+    response = client.post(reverse("restore-backup"), {"manifest": second["manifest"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["records_restored"] == {"department": 3, "job": 2, "hired_employee": 7}
+    assert employee_rows() == expected
+    assert Department.objects.get(id=1).department == "Renamed"
+
+    assert client.get(reverse("backup"), {"incremental": "1", "year": "2021"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_row_versions_taken_after_writing(tables, django_assert_max_num_queries):
+    with django_assert_max_num_queries(20) as captured:
+        insert_instances(HiredEmployee, [HiredEmployee(id=10, name="Employee 10", department_id_id=1, job_id_id=1)])
+    statements = [query["sql"] for query in captured.captured_queries]
+    insert = next(i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO "dbdata_hiredemployee"'))
+    bump = next(i for i, sql in enumerate(statements) if '"dbdata_tableversion"' in sql)
+
+    # The version row is only locked once the rows are written
+    assert insert < bump
+    assert HiredEmployee.objects.get(id=10).row_version == 1
+
+
+@pytest.mark.django_db
+def test_restore_in_batches(tables, settings, django_assert_max_num_queries):
+    settings.RESTORE_BATCH_SIZE = 2
+    expected = employee_rows()
+    files = backup_all_tables()["files"]
+    HiredEmployee.objects.all().delete()
+
+    # Three inserts of at most two rows, one version stamp, then the rollups rebuilt once: no query per employee
+    with django_assert_max_num_queries(23) as captured:
+        assert restore_table("hired_employee", files["hired_employee"]) == 5
+    inserts = [query for query in captured.captured_queries if query["sql"].startswith('INSERT INTO "dbdata_hiredemployee"')]
+    assert len(inserts) == 3
+    assert employee_rows() == expected
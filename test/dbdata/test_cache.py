@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.cache import ResponseCache, get_table_versions
+from dbdata.models import Department, Job, HiredEmployee
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"aaaa", "application/json")
+    cache.set("b", b"bbbb", "application/json")
+    assert cache.get("a") is not None
+
+    cache.set("c", b"cccc", "application/json")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    # Over the size cap the oldest entries go, and too big entries are never stored
+    cache.set("d", b"dddddddd", "application/json")
+    assert list(cache.entries) == ["d"]
+    cache.set("e", b"e" * 11, "application/json")
+    assert cache.get("e") is None
+    assert cache.size == 8
+
+
+@pytest.mark.django_db
+def test_report_is_cached_until_a_write(client):
+    Department.objects.create(id=1, department="Accounting")
+    Job.objects.create(id=1, job="Accountant")
+    url = reverse("employees-hired-quarter")
+
+    def post_employee(employee_id):
+        response = client.post(
+            reverse("hired-employee-bulk-list-serializer"),
+            data=json.dumps([{
+                "id": employee_id,
+                "name": "Ann",
+                "datetime": "2021-01-10T00:00:00Z",
+                "department_id": 1,
+                "job_id": 1,
+            }]),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    post_employee(1)
+    versions = get_table_versions([HiredEmployee])
+
+    first = client.get(url)
+    assert first.status_code == status.HTTP_200_OK
+    assert first.streaming
+    body = first.getvalue()
+    assert "ETag" in first
+
+    # Served from the cache: only the table versions are read
+    with CaptureQueriesContext(connection) as queries:
+        second = client.get(url)
+    assert len(queries) == 1
+    assert second.getvalue() == body
+    assert second["ETag"] == first["ETag"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    # Other query parameters are other entries
+    assert client.get(url + "?year=2020")["ETag"] != first["ETag"]
+
+    post_employee(2)
+    assert get_table_versions([HiredEmployee]) != versions
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert response.status_code == status.HTTP_200_OK
+    assert list(json.loads(response.getvalue()).values())[0]["1"] == 2
@@ -0,0 +1,72 @@
+import csv
+import io
+
+import pytest
+from django.core.management import call_command
+
+from dbdata.models import Department, Job, HiredEmployee, RejectedRecord
+
+
+@pytest.mark.django_db
+def test_load_historic(tmp_path):
+    (tmp_path / "departments.csv").write_text("1,Sales\n2,Marketing\n")
+    (tmp_path / "jobs.csv").write_text("1,Recruiter\n")
+    (tmp_path / "hired_employees.csv").write_text(
+        "1,Ann,2021-01-01T00:00:00Z,1,1\n"
+        "2,Bob,2021-02-01T00:00:00Z,2,\n"
+        "3,Cid,2021-03-01T00:00:00Z,9,1\n"
+        "4,Dan,,2,1\n"
+        "1,Eve,2021-04-01T00:00:00Z,1,1\n"
+    )
+    rejects_file = tmp_path / "rejects.csv"
+
+    call_command("load_historic", data_dir=str(tmp_path), rejects=str(rejects_file), batch_size=2, quarantine=True)
+
+    assert Department.objects.count() == 2
+    assert Job.objects.count() == 1
+    assert sorted(HiredEmployee.objects.values_list("id", flat=True)) == [1, 4]
+
+    with open(rejects_file) as f:
+        rejected = list(csv.DictReader(f))
+    assert [(row["table"], row["line"]) for row in rejected] == [
+        ("hired_employee", "2"), ("hired_employee", "3"), ("hired_employee", "5"),
+    ]
+    assert rejected[0]["reason"] == "missing job_id"
+
+    assert RejectedRecord.objects.filter(table="hired_employee", source="load_historic").count() == 3
+    assert RejectedRecord.objects.get(payload__id="2").payload["job_id"] is None
+
+
+@pytest.mark.django_db
+def test_load_historic_rejects_default(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "departments.csv").write_text("1,Sales\n")
+    (data_dir / "jobs.csv").write_text("1,Recruiter\n")
+    (data_dir / "hired_employees.csv").write_text("1,Ann,2021-01-01T00:00:00Z,1,\n")
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    call_command("load_historic", data_dir=str(data_dir))
+
+    # The data directory is left as it was
+    assert sorted(path.name for path in data_dir.iterdir()) == ["departments.csv", "hired_employees.csv", "jobs.csv"]
+    assert (tmp_path / "rejected_rows.csv").exists()
+
+
+@pytest.mark.django_db
+def test_explain_reports():
+    Department.objects.create(id=1, department="Sales")
+    Job.objects.create(id=1, job="Recruiter")
+    out = io.StringIO()
+
+    call_command("explain_reports", year=2021, stdout=out)
+
+    plans = out.getvalue().split("-- ")[1:]
+    assert [plan.split(" (")[0] for plan in plans] == [
+        "employee table, extract(YEAR ...) = year",
+        "employee table, half-open datetime range",
+        "HiringSummary rollup, served by the report",
+    ]
+    # The range predicate can use the datetime index, the extract one cannot
+    assert "hiredemployee_datetime_idx" not in plans[0]
+    assert "hiredemployee_datetime_idx" in plans[1]
@@ -0,0 +1,90 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.models import Department, Job, HiredEmployee
+
+
+@pytest.fixture
+def employees():
+    for i in (1, 2):
+        Department.objects.create(id=i, department=f"Department {i}")
+    Job.objects.create(id=1, job="Accountant")
+    HiredEmployee.objects.bulk_create([
+        HiredEmployee(
+            id=i,
+            name=f"Employee {i}",
+            datetime=datetime.datetime(2021, i, 1, tzinfo=datetime.timezone.utc),
+            department_id_id=1 + i % 2,
+            job_id_id=1,
+        )
+        for i in range(1, 7)
+    ] + [HiredEmployee(id=7, name=None, datetime=None, department_id_id=1, job_id_id=1)])
+
+
+@pytest.mark.django_db
+def test_export_csv(client, employees):
+    response = client.get(reverse("export-table", kwargs={"table": "hired_employee"}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+
+    rows = list(csv.reader(io.StringIO(response.getvalue().decode())))
+    assert rows[0] == ["id", "name", "datetime", "department_id", "job_id"]
+    assert rows[1] == ["1", "Employee 1", "2021-01-01T00:00:00+00:00", "2", "1"]
+    assert rows[-1] == ["7", "", "", "1", "1"]
+    assert len(rows) == 8
+
+
+@pytest.mark.django_db
+def test_export_ndjson_filters(client, employees):
+    url = reverse("export-table", kwargs={"table": "hired_employee"})
+    response = client.get(url, {"format": "ndjson", "from": "2021-02-01", "to": "2021-05-01", "department_id": "1"})
+    assert response.status_code == status.HTTP_200_OK
+
+    rows = [json.loads(line) for line in response.getvalue().decode().splitlines()]
+    assert [row["id"] for row in rows] == [2, 4]
+    assert rows[0] == {
+        "id": 2, "name": "Employee 2", "datetime": "2021-02-01T00:00:00+00:00", "department_id": 1, "job_id": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_export_errors(client):
+    assert client.get(reverse("export-table", kwargs={"table": "unknown"})).status_code == status.HTTP_404_NOT_FOUND
+
+    url = reverse("export-table", kwargs={"table": "hired_employee"})
+    assert client.get(url, {"format": "xml"}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(url, {"from": "yesterday"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_export_columnar_formats(client, employees):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    url = reverse("export-table", kwargs={"table": "hired_employee"})
+    response = client.get(url, {"format": "arrow"})
+    assert response.status_code == status.HTTP_200_OK
+    table = pyarrow.ipc.open_stream(response.getvalue()).read_all()
+    assert table.column_names == ["id", "name", "datetime", "department_id", "job_id"]
+    assert table.schema.field("datetime").type == pyarrow.timestamp("us", tz="UTC")
+    assert table.column("id").to_pylist() == list(range(1, 8))
+    assert table.column("name").null_count == 1
+
+    response = client.get(url, {"format": "parquet", "department_id": "2"})
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(response.getvalue()))
+    assert table.column("id").to_pylist() == [1, 3, 5]
+
+
+@pytest.mark.django_db
+def test_export_without_pyarrow(client, monkeypatch):
+    monkeypatch.setattr("dbdata.formats.pyarrow", None)
+    url = reverse("export-table", kwargs={"table": "job"})
+    assert client.get(url, {"format": "parquet"}).status_code == status.HTTP_406_NOT_ACCEPTABLE
+    assert client.get(url, {"format": "json"}).status_code == status.HTTP_200_OK
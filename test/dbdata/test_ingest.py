@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from dbdata.ingest import copy_value, insert_instances, INGEST_COPY
+from dbdata.models import Department
+
+
+def test_copy_value():
+    assert copy_value(None) == "\\N"
+    assert copy_value(3) == "3"
+    assert copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_value(datetime(2021, 1, 2, 3, 4, 5, tzinfo=timezone.utc)) == "2021-01-02T03:04:05+00:00"
+
+
+@pytest.mark.django_db
+def test_insert_instances_copy_falls_back_to_bulk_create():
+    departments = [Department(id=i, department=f"Department {i}") for i in range(1, 8)]
+
+    inserted, rejected = insert_instances(Department, departments, method=INGEST_COPY, chunk_size=3)
+
+    assert len(inserted) == 7
+    assert rejected == []
+
+    assert Department.objects.count() == 7
+
+
+@pytest.mark.django_db
+def test_insert_instances_rejects_only_failing_rows():
+    Department.objects.create(id=5, department="Existing")
+    departments = [Department(id=i, department=f"Department {i}") for i in range(1, 11)]
+    departments.append(Department(id=1, department="Duplicate"))
+
+    inserted, rejected = insert_instances(Department, departments, chunk_size=4)
+
+    assert len(inserted) == 9
+    assert [(row["index"], row["id"]) for row in rejected] == [(4, 5), (10, 1)]
+    assert all(row["reason"] for row in rejected)
+    assert Department.objects.count() == 10
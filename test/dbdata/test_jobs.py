@@ -0,0 +1,109 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.jobs import ORPHANED_MESSAGE
+from dbdata.models import Department, Job, HiredEmployee, IngestJob
+
+
+@pytest.fixture
+def inline_jobs(settings, tmp_path):
+    settings.INGEST_JOB_WORKERS = 0
+    settings.INGEST_JOB_DIR = str(tmp_path)
+
+
+@pytest.mark.django_db
+def test_ingest_job(client, inline_jobs):
+    Department.objects.create(id=1, department="Accounting")
+    Job.objects.create(id=1, job="Accountant")
+    data = [
+        {"id": i, "name": f"Employee {i}", "datetime": "2021-01-01T00:00:00Z", "department_id": 1, "job_id": 1}
+        for i in range(1, 6)
+    ]
+    data[1]["job_id"] = 7
+    data[3]["datetime"] = "yesterday"
+
+    response = client.post(
+        reverse("ingest-jobs", kwargs={"table": "hired_employee"}) + "?chunk_size=2",
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    response = client.get(response.json()["url"])
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["status"] == "done"
+    assert job["rows_total"] == 5
+    assert job["rows_done"] == 5
+    assert job["rows_inserted"] == 3
+    assert [error["index"] for error in job["errors"]] == [1, 3]
+    assert sorted(HiredEmployee.objects.values_list("id", flat=True)) == [1, 3, 5]
+
+
+@pytest.mark.django_db
+def test_ingest_job_unknown_table(client, inline_jobs):
+    response = client.post(
+        reverse("ingest-jobs", kwargs={"table": "unknown"}),
+        data="[]",
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_ingest_job_gzip_avro_backup(client, inline_jobs):
+    with open("./backups/department_backup_20250520_021028.avro", "rb") as f:
+        body = gzip.compress(f.read())
+
+    response = client.post(
+        reverse("ingest-jobs", kwargs={"table": "department"}),
+        data=body,
+        content_type="avro/binary",
+        HTTP_CONTENT_ENCODING="gzip",
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    job = client.get(response.json()["url"]).json()
+    assert job["status"] == "done"
+    assert job["rows_inserted"] == Department.objects.count() > 0
+
+
+@pytest.mark.django_db
+def test_recover_ingest_jobs(inline_jobs, tmp_path):
+    payload = tmp_path / "orphaned.payload"
+    payload.write_text(json.dumps([{"id": 1, "job": "Accountant"}]))
+    running = IngestJob.objects.create(table="job", status=IngestJob.STATUS_RUNNING, payload_file=str(payload))
+    pending = IngestJob.objects.create(table="job", payload_file=str(tmp_path / "missing.payload"))
+
+    call_command("recover_ingest_jobs")
+    assert set(IngestJob.objects.values_list("status", flat=True)) == {IngestJob.STATUS_FAILED}
+    assert IngestJob.objects.get(pk=pending.pk).message == ORPHANED_MESSAGE
+    # The payloads of jobs that will not run again are removed
+    assert not payload.exists()
+
+    # Resubmitted jobs run again from their stored payload
+    payload.write_text(json.dumps([{"id": 1, "job": "Accountant"}]))
+    IngestJob.objects.filter(pk=running.pk).update(status=IngestJob.STATUS_RUNNING)
+    call_command("recover_ingest_jobs", resubmit=True)
+    assert IngestJob.objects.get(pk=running.pk).status == IngestJob.STATUS_DONE
+    assert list(Job.objects.values_list("job", flat=True)) == ["Accountant"]
+    assert not payload.exists()
+
+
+@pytest.mark.django_db
+def test_failed_ingest_job_removes_payload(client, inline_jobs, tmp_path):
+    response = client.post(
+        reverse("ingest-jobs", kwargs={"table": "job"}),
+        data="{}",
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    job = client.get(response.json()["url"]).json()
+    assert job["status"] == "failed"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+
+from dbdata.backup import backup_all_tables, backup_hired_employee_table, restore_backup, restore_hired_employee_table
+from dbdata.ingest import MODE_IGNORE, MODE_UPSERT, insert_instances
+from dbdata.models import Department, Job, HiredEmployee, HiringSummary
+from dbdata.rollups import summarize
+
+
+def hired(year):
+    return datetime.datetime(year, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def employees():
+    Department.objects.create(id=1, department="Accounting")
+    Job.objects.create(id=1, job="Accountant")
+    insert_instances(HiredEmployee, [
+        HiredEmployee(id=1, name="Ann", datetime=hired(2020), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=2, name="Bob", datetime=hired(2021), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=3, name="Cid", datetime=hired(2021), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=4, name="Dan", datetime=None, department_id_id=1, job_id_id=1),
+    ])
+
+
+def summary():
+    return {(row.year, row.quarter): row.total for row in HiringSummary.objects.all()}
+
+
+@pytest.mark.django_db
+def test_year_scoped_backup_and_restore(employees, settings, tmp_path):
+    settings.BASE_DIR = tmp_path
+    backup_file = backup_hired_employee_table([(2021, 2021)])
+    assert backup_file.endswith("_y2021.avro")
+
+    HiredEmployee.objects.filter(id=2).delete()
+    HiredEmployee.objects.filter(id=1).update(name="Changed")
+
+    assert restore_hired_employee_table(backup_file) == 4
+    assert sorted(HiredEmployee.objects.values_list("id", flat=True)) == [1, 2, 3, 4]
+    # Other years are left alone
+    assert HiredEmployee.objects.get(id=1).name == "Changed"
+    assert summarize(HiredEmployee.objects.all()) == {
+        (1, 1, year, quarter): total for (year, quarter), total in summary().items()
+    }
+
+
+@pytest.mark.django_db
+def test_year_scoped_manifest_restore(employees, settings, tmp_path):
+    settings.BASE_DIR = tmp_path
+    manifest = backup_all_tables([(2021, 2021)])
+
+    HiredEmployee.objects.filter(id=3).delete()
+    Department.objects.filter(id=1).update(department="Renamed")
+
+    assert restore_backup(manifest["manifest"]) == {"department": 1, "job": 1, "hired_employee": 4}
+    # The departments and jobs are upserted: the hires of other years survive
+    assert sorted(HiredEmployee.objects.values_list("id", flat=True)) == [1, 2, 3, 4]
+    assert Department.objects.get(id=1).department == "Accounting"
+    assert summary() == {(2020, 2): 1, (2021, 2): 2, (0, 0): 1}
+
+
+@pytest.mark.django_db
+def test_delete_hires(employees):
+    call_command("delete_hires", year="2021")
+
+    assert sorted(HiredEmployee.objects.values_list("id", flat=True)) == [1, 4]
+    assert summary() == {(2020, 2): 1, (0, 0): 1}
+
+
+@pytest.mark.django_db
+def test_partitioned_writes_check_ids(employees, monkeypatch):
+    # The partitioned table only enforces unique (id, datetime)
+    monkeypatch.setattr("dbdata.ingest.is_partitioned", lambda: True)
+    monkeypatch.setattr("dbdata.ingest.ensure_employee_partitions", lambda instances: None)
+
+    inserted, rejected = insert_instances(HiredEmployee, [
+        HiredEmployee(id=5, name="Eve", datetime=hired(2022), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=1, name="Ann", datetime=hired(2022), department_id_id=1, job_id_id=1),
+    ])
+    assert [instance.id for instance in inserted] == [5]
+    assert [error["id"] for error in rejected] == [1]
+
+    insert_instances(HiredEmployee, [
+        HiredEmployee(id=6, name="Fay", datetime=hired(2022), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=6, name="Fay again", datetime=hired(2022), department_id_id=1, job_id_id=1),
+        HiredEmployee(id=2, name="Bob again", datetime=hired(2022), department_id_id=1, job_id_id=1),
+    ], mode=MODE_IGNORE)
+    assert HiredEmployee.objects.get(id=6).name == "Fay"
+    assert HiredEmployee.objects.get(id=2).name == "Bob"
+
+    # Upserts replace the row, moving it to the year of its new datetime
+    insert_instances(HiredEmployee, [
+        HiredEmployee(id=2, name="Bob", datetime=hired(2023), department_id_id=1, job_id_id=1),
+    ], mode=MODE_UPSERT)
+    assert HiredEmployee.objects.get(id=2).datetime == hired(2023)
+    assert summary()[(2021, 2)] == 1
+    assert summary()[(2023, 2)] == 1
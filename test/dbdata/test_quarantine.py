@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.models import Department, Job, HiredEmployee, RejectedRecord
+
+
+@pytest.mark.django_db
+def test_quarantine_and_replay(client):
+    Department.objects.create(id=1, department="Accounting")
+    Job.objects.create(id=1, job="Accountant")
+    data = [
+        {"id": i, "name": f"Employee {i}", "datetime": "2021-01-01T00:00:00Z", "department_id": 1, "job_id": 1}
+        for i in range(1, 6)
+    ]
+    data[1]["job_id"] = 2
+    data[2]["job_id"] = 2
+
+    response = client.post(
+        reverse("hired-employee-bulk-list-serializer") + "?on_error=quarantine",
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert response.json()["inserted"] == 3
+
+    response = client.get(reverse("rejected-records") + "?table=hired_employee&page_size=1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == 2
+    assert len(response.json()["results"]) == 1
+    record = response.json()["results"][0]
+    assert record["payload"]["id"] == 2
+    assert record["payload"]["job_id"] == 2
+    assert "job_id" in record["reason"]
+
+    # Still missing the job: the rows stay in quarantine
+    response = client.post(
+        reverse("replay-rejected-records"),
+        data=json.dumps({"table": "hired_employee"}),
+        content_type="application/json",
+    )
+    assert response.json()["rejected"] == 2
+    assert RejectedRecord.objects.get(payload__id=2).attempts == 1
+
+    Job.objects.create(id=2, job="Auditor")
+    response = client.post(
+        reverse("replay-rejected-records"),
+        data=json.dumps({"table": "hired_employee"}),
+        content_type="application/json",
+    )
+    assert response.json()["inserted"] == 2
+    assert RejectedRecord.objects.count() == 0
+    assert HiredEmployee.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_quarantine_database_rejections(client):
+    Department.objects.create(id=1, department="Accounting")
+
+    response = client.post(
+        reverse("departments-bulk-list-serializer"),
+        data=json.dumps([{"id": 1, "department": "Duplicate"}, {"id": 2, "department": "Sales"}]),
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+
+    record = RejectedRecord.objects.get()
+    assert record.table == "department"
+    assert record.payload == {"id": 1, "department": "Duplicate"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("data", [
+    [{"table": "department"}],
+    {"table": "department", "ids": "abc"},
+    {"table": "department", "ids": [1, "2"]},
+    {"table": "unknown"},
+])
+def test_replay_rejects_invalid_bodies(client, data):
+    response = client.post(
+        reverse("replay-rejected-records"),
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["status"] == "error"
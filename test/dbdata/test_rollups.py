@@ -0,0 +1,166 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.models import Department, Job, HiredEmployee, HiringSummary
+
+
+def summary():
+    return {
+        (row.department_id_id, row.job_id_id, row.year, row.quarter): row.total
+        for row in HiringSummary.objects.all()
+    }
+
+
+def report_rows(response):
+    # The reports are streamed
+    return list(json.loads(response.getvalue()).values())
+
+
+def post_employees(client, data, query=""):
+    return client.post(
+        reverse("hired-employee-bulk-list-serializer") + query,
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+
+
+@pytest.fixture
+def hires(client):
+    Department.objects.create(id=1, department="Accounting")
+    Department.objects.create(id=2, department="Sales")
+    Job.objects.create(id=1, job="Accountant")
+    Job.objects.create(id=2, job="Seller")
+    data = [
+        {"id": 1, "name": "Ann", "datetime": "2021-01-10T00:00:00Z", "department_id": 1, "job_id": 1},
+        {"id": 2, "name": "Bob", "datetime": "2021-02-10T00:00:00Z", "department_id": 1, "job_id": 1},
+        {"id": 3, "name": "Cid", "datetime": "2021-07-10T00:00:00Z", "department_id": 2, "job_id": 2},
+        {"id": 4, "name": "Dan", "datetime": "2020-12-10T00:00:00Z", "department_id": 2, "job_id": 2},
+        {"id": 5, "name": "Eve", "datetime": "2020-11-10T00:00:00Z", "department_id": 2, "job_id": 2},
+        {"id": 6, "name": "Fay", "datetime": None, "department_id": 2, "job_id": 1},
+    ]
+    assert post_employees(client, data).status_code == status.HTTP_201_CREATED
+    return data
+
+
+@pytest.mark.django_db
+def test_summary_follows_bulk_inserts(client, hires):
+    assert summary() == {
+        (1, 1, 2021, 1): 2,
+        (2, 2, 2021, 3): 1,
+        (2, 2, 2020, 4): 2,
+        (2, 1, 0, 0): 1,
+    }
+
+    # Duplicates are not counted twice
+    assert post_employees(client, hires[:2], "?mode=ignore").status_code == status.HTTP_201_CREATED
+    assert summary()[(1, 1, 2021, 1)] == 2
+
+    # Updated rows move to their new period
+    moved = dict(hires[0], datetime="2021-05-10T00:00:00Z")
+    assert post_employees(client, [moved], "?mode=upsert").status_code == status.HTTP_201_CREATED
+    assert summary()[(1, 1, 2021, 1)] == 1
+    assert summary()[(1, 1, 2021, 2)] == 1
+
+    # A repeated id is counted once, in the period of its last row
+    repeated = [dict(hires[1], datetime="2021-08-10T00:00:00Z"), dict(hires[1], name="Bo")]
+    assert post_employees(client, repeated, "?mode=upsert").status_code == status.HTTP_201_CREATED
+    assert summary()[(1, 1, 2021, 1)] == 1
+    assert (1, 1, 2021, 3) not in summary()
+
+    # Rejected rows are rolled back with their chunk
+    response = post_employees(client, [dict(hires[1], id=7), hires[2]])
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert summary()[(1, 1, 2021, 1)] == 2
+    assert summary()[(2, 2, 2021, 3)] == 1
+
+    incremental = summary()
+    call_command("rebuild_hiring_summary")
+    assert summary() == incremental
+
+
+@pytest.mark.django_db
+def test_department_delete_cascades_to_summary(hires):
+    Department.objects.filter(id=1).delete()
+    assert not HiringSummary.objects.filter(department_id=1).exists()
+    assert HiredEmployee.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_employees_hired_quarter(client, hires):
+    response = client.get(reverse("employees-hired-quarter"))
+    assert response.status_code == status.HTTP_200_OK
+    assert report_rows(response) == [
+        {"department": "Accounting", "job": "Accountant", "1": 2, "2": 0, "3": 0, "4": 0},
+        {"department": "Sales", "job": "Seller", "1": 0, "2": 0, "3": 1, "4": 0},
+    ]
+
+    response = client.get(reverse("employees-hired-quarter") + "?year=2020-2021")
+    rows = {(row["department"], row["job"]): row for row in report_rows(response)}
+    assert rows[("Sales", "Seller")]["4"] == 2
+
+    response = client.get(reverse("employees-hired-quarter") + "?year=2021-2020")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_employees_hired_department(client, hires):
+    # 2021: 2 hires in Accounting and 1 in Sales, so the mean is 1.5
+    response = client.get(reverse("employees-hired-department"))
+    assert response.status_code == status.HTTP_200_OK
+    assert report_rows(response) == [
+        {"id": 2, "department": "Sales", "total": 4},
+        {"id": 1, "department": "Accounting", "total": 2},
+    ]
+
+    # 2020: only Sales hired, 2 employees
+    response = client.get(reverse("employees-hired-department") + "?year=2020")
+    assert report_rows(response) == [
+        {"id": 2, "department": "Sales", "total": 4},
+    ]
+
+
+@pytest.mark.django_db
+def test_employees_hired_quarter_without_filter_clause(client, hires, monkeypatch):
+    from django.db import connection
+
+    expected = report_rows(client.get(reverse("employees-hired-quarter") + "?year=2020-2021"))
+    monkeypatch.setattr(connection.features, "supports_aggregate_filter_clause", False)
+    response = client.get(reverse("employees-hired-quarter") + "?year=2020,2021")
+    assert report_rows(response) == expected
+
+
+@pytest.mark.django_db
+def test_report_formats(client, hires):
+    url = reverse("employees-hired-quarter")
+    response = client.get(url + "?format=csv")
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "text/csv"
+    assert response.getvalue().decode().splitlines() == [
+        "department,job,1,2,3,4",
+        "Accounting,Accountant,2,0,0,0",
+        "Sales,Seller,0,0,1,0",
+    ]
+
+    assert client.get(url + "?format=xml").status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_report_columnar_formats(client, hires):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    expected = report_rows(client.get(reverse("employees-hired-department")))
+
+    response = client.get(reverse("employees-hired-department") + "?format=arrow")
+    assert response.status_code == status.HTTP_200_OK
+    table = pyarrow.ipc.open_stream(response.getvalue()).read_all()
+    assert table.schema.field("total").type == pyarrow.int64()
+    assert table.to_pylist() == expected
+
+    response = client.get(reverse("employees-hired-department") + "?format=parquet")
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(response.getvalue()))
+    assert table.to_pylist() == expected
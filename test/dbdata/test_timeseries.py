@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from dbdata.models import Department, Job, HiredEmployee, HiringDailySummary, HiringMonthlySummary
+from dbdata.rollups import rebuild_hiring_summary
+
+
+def timeseries(client, **params):
+    response = client.get(reverse("hiring-timeseries"), params)
+    assert response.status_code == status.HTTP_200_OK
+    return list(json.loads(response.getvalue()).values())
+
+
+def post_employees(client, data, query=""):
+    return client.post(
+        reverse("hired-employee-bulk-list-serializer") + query,
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+
+
+@pytest.fixture
+def hires(client):
+    Department.objects.create(id=1, department="Accounting")
+    Department.objects.create(id=2, department="Sales")
+    Job.objects.create(id=1, job="Accountant")
+    data = [
+        {"id": 1, "name": "Ann", "datetime": "2021-01-04T10:00:00Z", "department_id": 1, "job_id": 1},
+        {"id": 2, "name": "Bob", "datetime": "2021-01-06T10:00:00Z", "department_id": 2, "job_id": 1},
+        {"id": 3, "name": "Cid", "datetime": "2021-01-11T10:00:00Z", "department_id": 1, "job_id": 1},
+        {"id": 4, "name": "Dan", "datetime": "2021-05-20T10:00:00Z", "department_id": 1, "job_id": 1},
+        {"id": 5, "name": "Eve", "datetime": "2019-12-31T10:00:00Z", "department_id": 2, "job_id": 1},
+        {"id": 6, "name": "Fay", "datetime": None, "department_id": 2, "job_id": 1},
+    ]
+    assert post_employees(client, data).status_code == status.HTTP_201_CREATED
+    return data
+
+
+@pytest.mark.django_db
+def test_rollups_follow_writes(client, hires):
+    assert HiringDailySummary.objects.filter(day="2021-01-04").get().total == 1
+    assert HiringMonthlySummary.objects.filter(month="2021-01-01", department_id=1).get().total == 2
+
+    moved = dict(hires[0], datetime="2021-02-01T10:00:00Z")
+    assert post_employees(client, [moved], "?mode=upsert").status_code == status.HTTP_201_CREATED
+    assert not HiringDailySummary.objects.filter(day="2021-01-04").exists()
+    assert HiringMonthlySummary.objects.filter(month="2021-02-01").get().total == 1
+
+    daily = list(HiringDailySummary.objects.values_list("department_id", "job_id", "day", "total").order_by("day"))
+    rebuild_hiring_summary()
+    assert list(HiringDailySummary.objects.values_list("department_id", "job_id", "day", "total").order_by("day")) == daily
+
+    HiredEmployee.objects.filter(id=3).delete()
+    rebuild_hiring_summary([(2021, 2021)])
+    assert HiringMonthlySummary.objects.filter(month="2021-01-01").get().total == 1
+    assert HiringMonthlySummary.objects.filter(month="2019-12-01").exists()
+
+
+@pytest.mark.django_db
+def test_hiring_timeseries(client, hires):
+    assert timeseries(client, granularity="quarter") == [
+        {"period": "2019-10-01", "total": 1},
+        {"period": "2021-01-01", "total": 3},
+        {"period": "2021-04-01", "total": 1},
+    ]
+
+    # Weeks start on Monday and from/to are widened to whole buckets
+    assert timeseries(client, granularity="week", **{"from": "2021-01-05", "to": "2021-01-11"}) == [
+        {"period": "2021-01-04", "total": 2},
+        {"period": "2021-01-11", "total": 1},
+    ]
+
+    assert timeseries(client, granularity="month", group_by="department", **{"from": "2021-01-01"}) == [
+        {"period": "2021-01-01", "department_id": 1, "department": "Accounting", "total": 2},
+        {"period": "2021-01-01", "department_id": 2, "department": "Sales", "total": 1},
+        {"period": "2021-05-01", "department_id": 1, "department": "Accounting", "total": 1},
+    ]
+
+    rows = timeseries(client, granularity="day", group_by="department,job", to="2021-01-04")
+    assert rows[-1] == {
+        "period": "2021-01-04", "department_id": 1, "department": "Accounting", "job_id": 1, "job": "Accountant", "total": 1,
+    }
+    assert len(rows) == 2
+
+    response = client.get(reverse("hiring-timeseries"), {"granularity": "day", "format": "csv"})
+    assert response.getvalue().decode().splitlines()[:2] == ["period,total", "2019-12-31,1"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [
+    {"granularity": "year"},
+    {"group_by": "location"},
+    {"from": "2021-13-01"},
+    {"from": "2021-02-01", "to": "2021-01-01"},
+])
+def test_hiring_timeseries_errors(client, params):
+    response = client.get(reverse("hiring-timeseries"), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
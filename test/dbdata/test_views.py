@@ -1,9 +1,15 @@
+import gzip
+import io
 import json
 
+import avro.schema
 import pytest
+from avro.datafile import DataFileWriter
+from avro.io import DatumWriter
 from csv import DictReader
 
-from dbdata.models import Department, Job
+from dbdata.backup import SCHEMAS
+from dbdata.models import Department, Job, HiredEmployee
 from django.urls import reverse
 from rest_framework import status
 
@@ -115,6 +121,184 @@ class TestDepartment:
 
         assert len(response.json()) == len(data)
 
+    @pytest.mark.django_db
+    def test_bulk_create_ingest_method(self, client):
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        data = [{"id": i, "department": f"Department {i}"} for i in range(1, 6)]
+
+        response = client.post(
+            f"{test_url}?ingest=copy",
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Department.objects.count() == 5
+
+        response = client.post(
+            f"{test_url}?ingest=unknown",
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_bulk_create_partial_success(self, client):
+        Department.objects.create(id=3, department="Existing")
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        data = [{"id": i, "department": f"Department {i}"} for i in range(1, 6)]
+
+        response = client.post(
+            f"{test_url}?chunk_size=2",
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert response.json()["inserted"] == 4
+        assert [row["index"] for row in response.json()["rejected"]] == [2]
+        assert Department.objects.count() == 5
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("mode, expected, written", [
+        ("upsert", "Updated", [{"id": 1, "department": "Updated"}, {"id": 2, "department": "New"}]),
+        # Skipped rows are not reported as written
+        ("ignore", "Existing", [{"id": 2, "department": "New"}]),
+    ])
+    def test_bulk_create_conflict_modes(self, client, mode, expected, written):
+        Department.objects.create(id=1, department="Existing")
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        data = [{"id": 1, "department": "Updated"}, {"id": 2, "department": "New"}]
+
+        response = client.post(
+            f"{test_url}?mode={mode}",
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json() == written
+        assert Department.objects.get(id=1).department == expected
+        assert Department.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_bulk_create_upsert_repeated_id(self, client):
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        data = [{"id": 1, "department": "First"}, {"id": 2, "department": "New"}, {"id": 1, "department": "Last"}]
+
+        # One upsert statement cannot touch a row twice on PostgreSQL: the last row of the id is kept
+        response = client.post(
+            f"{test_url}?mode=upsert",
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Department.objects.get(id=1).department == "Last"
+        assert Department.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_bulk_create_ndjson(self, client):
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        body = "\n".join(json.dumps({"id": i, "department": f"Department {i}"}) for i in range(1, 6))
+        body += "\n{not json}\n"
+
+        response = client.post(
+            f"{test_url}?chunk_size=2",
+            data=body,
+            content_type="application/x-ndjson",
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert response.json()["read"] == 6
+        assert response.json()["inserted"] == 5
+        assert [row["index"] for row in response.json()["rejected"]] == [5]
+        assert Department.objects.count() == 5
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("content_type, body", [
+        ("application/json", json.dumps([{"id": 1, "department": "Sales"}, {"id": 2, "department": "Marketing"}])),
+        ("application/x-ndjson", '{"id": 1, "department": "Sales"}\n{"id": 2, "department": "Marketing"}\n'),
+        ("text/csv", "1,Sales\n2,Marketing\n"),
+    ])
+    def test_bulk_create_gzip(self, client, content_type, body):
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+
+        response = client.post(
+            test_url,
+            data=gzip.compress(body.encode()),
+            content_type=content_type,
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert sorted(Department.objects.values_list("department", flat=True)) == ["Marketing", "Sales"]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("content_type", ["application/json", "application/x-ndjson", "text/csv"])
+    def test_bulk_create_corrupt_gzip(self, client, content_type):
+        test_url = reverse(
+            "departments-bulk-list-serializer",
+        )
+        rows = "".join(f"{i},Department {i}\n" for i in range(1, 1001))
+
+        for body in (b"not gzip", gzip.compress(rows.encode())[:-100]):
+            # Truncated bodies are rejected before any chunk is inserted
+            response = client.post(
+                f"{test_url}?chunk_size=1",
+                data=body,
+                content_type=content_type,
+                HTTP_CONTENT_ENCODING="gzip",
+            )
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert Department.objects.count() == 0
+
+    @pytest.mark.django_db
+    def test_bulk_create_avro(self, client):
+        body = io.BytesIO()
+        writer = DataFileWriter(body, DatumWriter(), avro.schema.parse(json.dumps(SCHEMAS["department"])))
+        for i in range(1, 4):
+            writer.append({"id": i, "department": f"Department {i}"})
+        writer.flush()
+
+        response = client.post(
+            reverse("departments-bulk-list-serializer"),
+            data=body.getvalue(),
+            content_type="avro/binary",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["inserted"] == 3
+
+        response = client.post(
+            reverse("job-bulk-list-serializer"),
+            data=body.getvalue(),
+            content_type="avro/binary",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Job.objects.count() == 0
+
 
 class TestHiredEmployees:
     @pytest.mark.django_db
@@ -150,3 +334,113 @@ class TestHiredEmployees:
         assert response.status_code == status.HTTP_201_CREATED
 
         assert len(response.json()) == len(data)
+
+    @pytest.mark.django_db
+    def test_bulk_create_foreign_key_errors(self, client):
+        Department.objects.create(id=1, department="Accounting")
+        Job.objects.create(id=1, job="Accountant")
+
+        test_url = reverse(
+            "hired-employee-bulk-list-serializer",
+        )
+        data = [
+            {"id": 1, "name": "Ann", "datetime": "2021-01-01T00:00:00Z", "department_id": 1, "job_id": 1},
+            {"id": 2, "name": "Bob", "datetime": "2021-01-01T00:00:00Z", "department_id": 9, "job_id": 1},
+            {"id": 3, "name": "Cid", "datetime": "2021-01-01T00:00:00Z", "department_id": 1, "job_id": ""},
+        ]
+
+        response = client.post(
+            test_url,
+            data=json.dumps(
+                data
+            ),
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = response.json()["errors"]
+        assert [error["index"] for error in errors] == [1, 2]
+        assert "department_id" in errors[0]
+        assert "job_id" in errors[1]
+        assert HiredEmployee.objects.count() == 0
+
+    @pytest.mark.django_db
+    def test_bulk_create_foreign_keys_checked_once(self, client, django_assert_max_num_queries):
+        Department.objects.create(id=1, department="Accounting")
+        Job.objects.create(id=1, job="Accountant")
+
+        test_url = reverse(
+            "hired-employee-bulk-list-serializer",
+        )
+        data = [
+            {"id": i, "name": f"Employee {i}", "datetime": "2021-01-01T00:00:00Z", "department_id": 1, "job_id": "1"}
+            for i in range(1, 51)
+        ]
+
+        # Savepoints, the inserts, the three rollup upserts and the version stamp of the written ids: none of them per row
+        with django_assert_max_num_queries(13):
+            response = client.post(
+                test_url,
+                data=json.dumps(
+                    data
+                ),
+                content_type="application/json",
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert HiredEmployee.objects.count() == 50
+
+    @pytest.mark.django_db
+    def test_bulk_create_csv(self, client):
+        for i in range(1, 13):
+            Department.objects.create(id=i, department=f"Department {i}")
+        for i in range(1, 184):
+            Job.objects.create(id=i, job=f"Job {i}")
+
+        test_url = reverse(
+            "hired-employee-bulk-list-serializer",
+        )
+        with open("./historic_data/hired_employees.csv", "rb") as f:
+            body = f.read()
+
+        response = client.post(
+            f"{test_url}?chunk_size=500",
+            data=body,
+            content_type="text/csv",
+        )
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        result = response.json()
+        assert result["read"] == 1999
+        assert result["inserted"] + len(result["rejected"]) == 1999
+        assert HiredEmployee.objects.count() == result["inserted"]
+
+
+@pytest.mark.django_db
+def test_bulk_list_cursor_pagination(client, django_assert_max_num_queries):
+    Department.objects.create(id=1, department="Accounting")
+    Job.objects.create(id=1, job="Accountant")
+    HiredEmployee.objects.bulk_create([
+        HiredEmployee(id=i, name=f"Employee {i}", datetime=None, department_id_id=1, job_id_id=1)
+        for i in range(1, 6)
+    ])
+
+    url = reverse("hired-employee-bulk-list-serializer") + "?page_size=2"
+    ids = []
+    while url:
+        # One query per page, the foreign keys are not loaded
+        with django_assert_max_num_queries(1):
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["results"]) <= 2
+        ids += [row["id"] for row in page["results"]]
+        url = page["next"]
+
+    assert ids == [1, 2, 3, 4, 5]
+    assert page["results"][-1] == {
+        "id": 5, "name": "Employee 5", "datetime": None, "department_id": 1, "job_id": 1,
+    }
+
+    response = client.get(reverse("departments-bulk-list-serializer"))
+    assert response.json()["results"] == [{"id": 1, "department": "Accounting"}]